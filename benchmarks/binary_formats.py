@@ -0,0 +1,54 @@
+"""
+Compares the size of, and the time taken to encode and decode, payloads in
+JSON and in the binary formats (whichever of them are installed)
+"""
+from __future__ import print_function
+
+from . import utils
+
+import datetime
+from decimal import Decimal
+
+from simple_rest.utils import serializers
+
+
+def payloads():
+    now = datetime.datetime(2013, 1, 1, 12, 30)
+    row = {
+        'id': 1,
+        'fname': u'Winston',
+        'lname': u'Smith',
+        'phone_number': u'555-555-5555',
+        'balance': Decimal('1024.50'),
+        'created': now,
+        'tags': [u'one', u'two', u'three'],
+        'active': True,
+    }
+    # (name, payload, number of calls to time)
+    return (
+        ('small object', row, 5000),
+        ('list of 100 objects', [dict(row, id=i) for i in range(100)], 100),
+        ('list of 10000 ints', list(range(10000)), 100),
+    )
+
+
+def formats():
+    # (name, encode, decode)
+    yield 'json', serializers.to_json, serializers.from_json
+    if serializers.msgpack is not None:
+        yield 'msgpack', serializers.to_msgpack, serializers.from_msgpack
+    if serializers.cbor2 is not None:
+        yield 'cbor', serializers.to_cbor, serializers.from_cbor
+
+
+def main():
+    for name, payload, number in payloads():
+        for format_name, encode, decode in formats():
+            encoded = encode(payload)
+            print('%-50s %12d bytes' % ('%s: %s' % (name, format_name), len(encoded)))
+            utils.bench('%s: %s encode' % (name, format_name), lambda: encode(payload), number=number)
+            utils.bench('%s: %s decode' % (name, format_name), lambda: decode(encoded), number=number)
+
+
+if __name__ == '__main__':
+    main()
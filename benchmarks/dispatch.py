@@ -0,0 +1,57 @@
+"""
+Measures the overhead Resource.dispatch adds to a request
+"""
+from . import utils
+
+import json
+
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from django.views.generic import View
+
+from simple_rest import Resource
+from simple_rest.response import RESTfulResponse
+
+
+class PlainView(View):
+
+    def get(self, request, **kwargs):
+        return HttpResponse()
+
+
+class Plain(Resource):
+
+    def get(self, request, **kwargs):
+        return HttpResponse()
+
+    def put(self, request, **kwargs):
+        return HttpResponse(request.PUT.get('fname'))
+
+
+@RESTfulResponse()
+class Negotiated(Resource):
+
+    def get(self, request, **kwargs):
+        return {'fname': u'Winston', 'lname': u'Smith'}
+
+
+def main():
+    factory = RequestFactory()
+    body = json.dumps({'fname': 'Winston', 'lname': 'Smith'})
+    plain_view, plain, negotiated = PlainView.as_view(), Plain.as_view(), Negotiated.as_view()
+
+    utils.bench('django View (GET)', lambda: plain_view(factory.get('/')))
+    utils.bench('Resource (GET)', lambda: plain(factory.get('/')))
+    utils.bench('Resource (PUT, form body)',
+                lambda: plain(factory.put('/', 'fname=Winston&lname=Smith',
+                                          content_type='application/x-www-form-urlencoded')))
+    utils.bench('Resource (PUT, JSON body)',
+                lambda: plain(factory.put('/', body, content_type='application/json')))
+    utils.bench('Resource (POST with _method=PUT)',
+                lambda: plain(factory.post('/?_method=PUT', {'fname': 'Winston'})))
+    utils.bench('Resource + RESTfulResponse (GET)',
+                lambda: negotiated(factory.get('/', HTTP_ACCEPT='application/json')))
+
+
+if __name__ == '__main__':
+    main()
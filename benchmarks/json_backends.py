@@ -0,0 +1,39 @@
+"""
+Compares the registered JSON backends on typical API payloads
+"""
+from . import utils
+
+import datetime
+from decimal import Decimal
+
+from simple_rest.utils.serializers import JSON_BACKENDS
+
+
+def payloads():
+    now = datetime.datetime(2013, 1, 1, 12, 30)
+    row = {
+        'id': 1,
+        'fname': u'Winston',
+        'lname': u'Smith',
+        'phone_number': u'555-555-5555',
+        'balance': Decimal('1024.50'),
+        'created': now,
+        'tags': [u'one', u'two', u'three'],
+        'active': True,
+    }
+    # (name, payload, number of calls to time)
+    return (
+        ('small object', row, 10000),
+        ('list of 100 objects', [dict(row, id=i) for i in range(100)], 200),
+        ('list of 10000 ints', list(range(10000)), 100),
+    )
+
+
+def main():
+    for name, payload, number in payloads():
+        for backend_name, dumps in sorted(JSON_BACKENDS.items()):
+            utils.bench('%s: %s' % (name, backend_name), lambda: dumps(payload), number=number)
+
+
+if __name__ == '__main__':
+    main()
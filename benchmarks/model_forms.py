@@ -0,0 +1,29 @@
+"""
+Measures the construction, and validation, of simple_rest ModelForms
+"""
+from . import utils
+
+from simple_rest.forms import ModelForm
+
+
+def main():
+    utils.setup_database()
+    from .models import Contact
+
+    class ContactForm(ModelForm):
+        class Meta:
+            model = Contact
+            fields = '__all__'
+
+    data = {'fname': u'Winston', 'lname': u'Smith', 'phone_number': u'555-555-5555',
+            'created': u'2013-01-01 12:30', 'author': 1}
+    contact = Contact.objects.get(pk=1)
+
+    utils.bench('ModelForm() (new object)', lambda: ContactForm(data), number=2000)
+    utils.bench('ModelForm() (existing object)', lambda: ContactForm({'fname': u'Julia'}, instance=contact),
+                number=2000)
+    utils.bench('ModelForm().is_valid()', lambda: ContactForm(data).is_valid(), number=500)
+
+
+if __name__ == '__main__':
+    main()
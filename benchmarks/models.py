@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=30)
+
+
+class Contact(models.Model):
+    title = models.CharField(max_length=10, default='(no title)')
+    fname = models.CharField(max_length=30)
+    lname = models.CharField(max_length=30)
+    phone_number = models.CharField(max_length=12)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created = models.DateTimeField()
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
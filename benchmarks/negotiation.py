@@ -0,0 +1,37 @@
+"""
+Measures the per-request cost of content negotiation in RESTfulResponse
+"""
+from . import utils
+
+from django.test.client import RequestFactory
+
+from simple_rest.response import RESTfulResponse
+
+
+ACCEPT_HEADERS = (
+    'application/json',
+    'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'text/plain;q=0.5, application/json',
+)
+
+
+def main():
+    factory = RequestFactory()
+    requests = [factory.get('/', HTTP_ACCEPT=accept) for accept in ACCEPT_HEADERS]
+    response = RESTfulResponse({'application/xml': 'template.xml'})
+
+    def uncached():
+        for request in requests:
+            response._clear_negotiation_cache()
+            response.negotiate(request)
+
+    def cached():
+        for request in requests:
+            response.negotiate(request)
+
+    utils.bench('negotiation (uncached)', uncached)
+    utils.bench('negotiation (cached)', cached)
+
+
+if __name__ == '__main__':
+    main()
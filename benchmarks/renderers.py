@@ -0,0 +1,31 @@
+"""
+Measures the cost of rendering payloads of several sizes as HTML and text
+"""
+from . import utils
+
+import datetime
+from decimal import Decimal
+
+from simple_rest.utils.serializers import to_html, to_text
+
+
+def payload(size):
+    now = datetime.datetime(2013, 1, 1, 12, 30)
+    return [{
+        'id': i,
+        'fname': u'Winston',
+        'lname': u'Smith',
+        'balance': Decimal('1024.50'),
+        'created': now,
+    } for i in range(size)]
+
+
+def main():
+    for size, number in ((1, 1000), (100, 50), (2000, 3)):
+        data = payload(size)
+        utils.bench('to_html (%d objects)' % size, lambda: to_html(data), number=number)
+        utils.bench('to_text (%d objects)' % size, lambda: to_text(data), number=number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Measures content negotiation and rendering in RESTfulResponse for each of
+the default mimetypes
+"""
+from . import utils
+
+import datetime
+from decimal import Decimal
+
+from django.test.client import RequestFactory
+
+from simple_rest.response import RESTfulResponse
+
+
+def payload(size):
+    now = datetime.datetime(2013, 1, 1, 12, 30)
+    return [{
+        'id': i,
+        'fname': u'Winston',
+        'lname': u'Smith',
+        'balance': Decimal('1024.50'),
+        'created': now,
+    } for i in range(size)]
+
+
+def main():
+    factory = RequestFactory()
+    response = RESTfulResponse()
+    for mimetype in response.keys():
+        request = factory.get('/', HTTP_ACCEPT=mimetype)
+        utils.bench('negotiate (%s)' % mimetype, lambda: response.negotiate(request))
+        for size, number in ((1, 1000), (100, 50)):
+            data = payload(size)
+            utils.bench('render_to_response (%s, %d objects)' % (mimetype, size),
+                        lambda: response.render_to_response(request, data), number=number)
+
+
+if __name__ == '__main__':
+    main()
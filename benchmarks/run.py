@@ -0,0 +1,116 @@
+"""
+Runs the benchmarks and writes their results out as JSON
+
+Run every benchmark, or just the ones named, from the root of the repository:
+
+    python -m benchmarks.run
+    python -m benchmarks.run dispatch signatures
+
+Save the results to compare them with those of another version later on:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+from __future__ import print_function
+
+from . import utils
+
+import datetime
+import json
+import optparse
+import platform
+import subprocess
+import sys
+
+import django
+try:
+    from importlib import import_module
+except ImportError:
+    # Python 2.6
+    from django.utils.importlib import import_module
+
+
+BENCHMARKS = (
+    'dispatch',
+    'pipeline',
+    'negotiation',
+    'responses',
+    'renderers',
+    'serialization',
+    'json_backends',
+    'binary_formats',
+    'signatures',
+    'model_forms',
+)
+
+
+def git_revision():
+    try:
+        revision = subprocess.Popen(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE).communicate()[0].strip()
+    except OSError:
+        return None
+    return revision.decode('ascii') or None
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints how each result compares to the baseline and returns the names of
+    the benchmarks that are more than threshold (e.g., 0.1 for 10%) slower
+    """
+    baseline = dict((result['name'], result['usec']) for result in baseline['results'])
+    regressions = []
+    print()
+    print('%-50s %12s %12s %8s' % ('benchmark', 'before', 'after', 'change'))
+    for result in results:
+        before = baseline.get(result['name'])
+        if not before:
+            continue
+        change = result['usec'] / before - 1
+        print('%-50s %12.2f %12.2f %+7.1f%%' % (result['name'], before, result['usec'], change * 100))
+        if change > threshold:
+            regressions.append(result['name'])
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] [benchmark ...]')
+    parser.add_option('-o', '--output', help='write the results, as JSON, to this file')
+    parser.add_option('-c', '--compare', help='compare the results to those in this JSON file')
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+                      help='the slowdown, as a fraction, reported as a regression (default: 0.1)')
+    parser.add_option('-l', '--label', help='a label for the results (default: the git revision)')
+    options, names = parser.parse_args(argv)
+
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmarks: %s' % ', '.join(unknown))
+
+    for name in names or BENCHMARKS:
+        print('== %s' % name)
+        import_module('benchmarks.%s' % name).main()
+
+    report = {
+        'label': options.label or git_revision(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'results': utils.results,
+    }
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as f:
+            regressions = compare(utils.results, json.load(f), options.threshold)
+        if regressions:
+            print()
+            print('%d benchmark(s) slower by more than %d%%' % (len(regressions), options.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
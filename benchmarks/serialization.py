@@ -0,0 +1,29 @@
+"""
+Measures to_json on dicts, Decimal objects, and QuerySets of several sizes
+"""
+from . import utils
+
+from decimal import Decimal
+
+from simple_rest.utils.serializers import to_json
+
+
+def main():
+    utils.setup_database()
+    from .models import Contact
+
+    row = {'id': 1, 'fname': u'Winston', 'lname': u'Smith', 'phone_number': u'555-555-5555'}
+    for size, number in ((1, 10000), (100, 200), (1000, 20)):
+        rows = [dict(row, id=i) for i in range(size)]
+        utils.bench('to_json (%d dicts)' % size, lambda: to_json(rows), number=number)
+
+        decimals = [Decimal('1024.50')] * size
+        utils.bench('to_json (%d Decimals)' % size, lambda: to_json(decimals), number=number)
+
+        queryset = Contact.objects.all()[:size]
+        utils.bench('to_json (QuerySet of %d objects)' % size, lambda: to_json(queryset.all()),
+                    number=number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+# Minimal Django settings used when running the benchmarks
+SECRET_KEY = 'benchmarks'
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+INSTALLED_APPS = (
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'simple_rest',
+    'benchmarks',
+)
+
+ROOT_URLCONF = 'benchmarks.urls'
+
+TEMPLATE_DIRS = ()
+
+# Django >= 1.8
+TEMPLATES = [{'BACKEND': 'django.template.backends.django.DjangoTemplates'}]
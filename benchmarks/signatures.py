@@ -0,0 +1,50 @@
+"""
+Measures the throughput of signature verification
+"""
+from . import utils
+
+import time
+
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from simple_rest.auth.decorators import validate_signature
+from simple_rest.auth.signature import calculate_signature
+
+
+SECRET_KEY = 'benchmark-secret-key'
+
+PARAMS = {
+    'fname': 'Winston',
+    'lname': 'Smith',
+    'phone_number': '555-555-5555',
+    'title': 'Mr.',
+}
+
+
+def signed_params(**extra):
+    params = dict(PARAMS, **extra)
+    timestamp = int(time.time())
+    params['sig'] = calculate_signature(SECRET_KEY, params, timestamp)
+    params['t'] = timestamp
+    return params
+
+
+def main(number=10000):
+    factory = RequestFactory()
+    timestamp = int(time.time())
+
+    utils.bench('calculate_signature', lambda: calculate_signature(SECRET_KEY, PARAMS, timestamp),
+                number=number)
+
+    # Every signature can only be used once with the replay cache turned on,
+    # so each call is given a new request (that has yet to parse its params)
+    for replay_cache in (None, 'local'):
+        with override_settings(SIMPLE_REST_REPLAY_CACHE=replay_cache):
+            requests = iter([factory.get('/', signed_params(n=i)) for i in range(3 * number)])
+            utils.bench('validate_signature (replay cache: %s)' % replay_cache,
+                        lambda: validate_signature(next(requests), SECRET_KEY), number=number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Helpers shared by the benchmarks
+
+Each benchmark is a module in this package that can be run from the root of
+the repository, e.g.,
+
+    python -m benchmarks.negotiation
+
+or all together, with machine-readable results, with benchmarks.run.
+"""
+from __future__ import print_function
+
+import datetime
+import os
+import timeit
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+if hasattr(django, 'setup'):
+    # Django >= 1.7
+    django.setup()
+
+# Every timing taken by bench, in the order they were taken
+results = []
+
+_database_ready = False
+
+
+def bench(name, func, number=10000, repeat=3):
+    """
+    Prints and returns the best time, in microseconds, of a single call to func
+    """
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    usec = best / number * 1e6
+    print('%-50s %12.2f usec/call' % (name, usec))
+    results.append({'name': name, 'usec': usec, 'number': number, 'repeat': repeat})
+    return usec
+
+
+def setup_database(contacts=1000):
+    """
+    Creates the tables of the benchmark models in the in-memory database and
+    fills them with the given number of contacts (only the first time it's
+    called)
+    """
+    global _database_ready
+    if _database_ready:
+        return
+
+    from django.core.management import call_command
+    from .models import Author, Contact
+
+    if django.VERSION >= (1, 9):
+        call_command('migrate', run_syncdb=True, interactive=False, verbosity=0)
+    else:
+        call_command('syncdb', interactive=False, verbosity=0)
+    author = Author.objects.create(name=u'George Orwell')
+    created = datetime.datetime(2013, 1, 1, 12, 30)
+    Contact.objects.bulk_create([Contact(
+        fname=u'Winston',
+        lname=u'Smith',
+        phone_number=u'555-555-5555',
+        balance=Decimal('1024.50'),
+        created=created,
+        author=author,
+    ) for i in range(contacts)])
+    _database_ready = True
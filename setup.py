@@ -19,8 +19,8 @@ setup(
     description='A drop dead simple package for creating RESTful APIs on top of Django',
     long_description=open('README.rst').read(),
     url='https://github.com/freshplum/django-simple-rest',
-    packages=find_packages(),
-    install_requires=['setuptools', 'mimeparse'],
+    packages=find_packages(exclude=['benchmarks']),
+    install_requires=['setuptools', 'python-mimeparse', 'six'],
     zip_safe=False,
     keywords='rest,django,api',
     classifiers=[
@@ -32,6 +32,7 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 2.6',
         'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
         'Topic :: Internet :: WWW/HTTP',
         'Topic :: Internet :: WWW/HTTP :: Dynamic Content',
         'Topic :: Software Development :: Libraries :: Python Modules'
@@ -0,0 +1,183 @@
+"""
+Support for resources whose handlers are coroutine functions (async def)
+
+This module is only imported on Python 3 with Django 4.1 or later (the first
+version that runs class-based views with async handlers), so none of the
+rest of the package may depend on it being there; see
+simple_rest.utils.decorators.asyncsupport.
+
+The stages of a resource method's pipeline (see
+simple_rest.utils.decorators.Stage) are plain, synchronous functions (e.g.,
+the test run by request_passes_test), which the async pipeline calls in a
+worker thread with sync_to_async, since they may use the database or the
+cache. The view itself is awaited on the event loop, so no thread is held
+while it waits on whatever it's waiting on.
+"""
+import inspect
+import types
+from functools import update_wrapper
+
+import django
+if django.VERSION < (4, 1):
+    raise ImportError('Async handlers require Django 4.1 or later')
+
+from asgiref.sync import async_to_sync, sync_to_async
+try:
+    from asgiref.sync import iscoroutinefunction
+except ImportError:
+    # asgiref < 3.7
+    from asyncio import iscoroutinefunction
+from django.http import HttpResponse
+
+from . import instrumentation
+from .exceptions import HttpError
+
+
+def compile_pipeline(method, stages):
+    """
+    The async version of simple_rest.utils.decorators.compile_pipeline
+    """
+    async def wrapper(self, request, *args, **kwargs):
+        response = await run_pipeline(stages, types.MethodType(method, self), request, args, kwargs)
+        return iterate_async(response)
+    return update_wrapper(wrapper, method)
+
+
+def compile_view_pipeline(method, stages, sync_wrapper):
+    """
+    Returns a method that runs one of Django's own View handlers (i.e.,
+    options) through the stages
+
+    Those handlers are plain functions that return a coroutine when the
+    view's other handlers are async, so the async pipeline is used for async
+    views and sync_wrapper for the rest.
+    """
+    async def awaiting_method(self, request, *args, **kwargs):
+        response = method(self, request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+    async_wrapper = compile_pipeline(update_wrapper(awaiting_method, method), stages)
+
+    def wrapper(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return async_wrapper(self, request, *args, **kwargs)
+        return sync_wrapper(self, request, *args, **kwargs)
+    return update_wrapper(wrapper, method)
+
+
+async def run_pipeline(stages, view, request, args, kwargs):
+    """
+    The async version of simple_rest.utils.decorators.run_pipeline
+
+    The view is awaited, while the stages' functions are run in a worker
+    thread.
+    """
+    entered = []
+    error = None
+    try:
+        for index, stage in enumerate(stages):
+            if stage.decorator is not None:
+                inner = stages[index + 1:]
+                async def inner_view(request, *args, **kwargs):
+                    return await run_pipeline(inner, view, request, args, kwargs)
+                result = await get_async_decorator(stage.decorator)(inner_view)(request, *args, **kwargs)
+                break
+
+            state = None
+            if stage.before is not None:
+                state, response = await sync_to_async(stage.before)(request, *args, **kwargs)
+                if response is not None:
+                    result = response
+                    break
+            entered.append((stage, state))
+        else:
+            with instrumentation.timer(request, 'view'):
+                result = await view(request, *args, **kwargs)
+    except HttpError as e:
+        error = e
+
+    while entered:
+        stage, state = entered.pop()
+        try:
+            if error is not None:
+                if stage.catch is None:
+                    continue
+                result, error = stage.catch(error), None
+            if stage.after is not None:
+                result = await sync_to_async(stage.after)(request, state, result)
+        except HttpError as e:
+            error = e
+    if error is not None:
+        raise error
+    return result
+
+
+def get_async_decorator(decorator):
+    """
+    Returns the async version of a decorator for view functions
+
+    A decorator can carry its async version in its async_decorator
+    attribute. Any other decorator is adapted to async views by running it
+    in a worker thread, with the view it wraps handed back to the event loop
+    with async_to_sync. That works with any decorator, but holds a thread for
+    as long as the view runs.
+    """
+    async_decorator = getattr(decorator, 'async_decorator', None)
+    if async_decorator is not None:
+        return async_decorator
+
+    def adapted_decorator(view_func):
+        wrapper = sync_to_async(decorator(async_to_sync(view_func)))
+        async def _wrapper(request, *args, **kwargs):
+            return await wrapper(request, *args, **kwargs)
+        return _wrapper
+    return adapted_decorator
+
+
+async def arender_to_response(self, request, data=None, status=200, format=None):
+    """
+    The awaitable version of RESTfulResponse.render_to_response
+    """
+    response = await sync_to_async(self.render_to_response)(request, data, status, format)
+    return iterate_async(response)
+
+
+def iterate_async(response):
+    """
+    Makes a streaming response iterate over its content asynchronously
+
+    Django has to read a synchronous iterator (e.g., a QuerySet being
+    rendered with to_json_stream) into memory, all at once, before it can
+    send it from an async view. Instead, each chunk of the content is read in
+    a worker thread as it's sent. Django 4.1 can't send asynchronous
+    iterators, so the response is left alone there.
+    """
+    if getattr(response, 'streaming', False) and not getattr(response, 'is_async', True):
+        response.streaming_content = _aiter(response.streaming_content)
+    return response
+
+
+async def _aiter(iterator):
+    iterator = iter(iterator)
+    read = sync_to_async(next)
+    done = object()
+    while True:
+        chunk = await read(iterator, done)
+        if chunk is done:
+            break
+        yield chunk
+
+
+async def finish_dispatch(request, response):
+    """
+    Awaits the response of a resource with async handlers and finishes it off
+    just as Resource.dispatch does for a synchronous one
+    """
+    try:
+        with instrumentation.timer(request, 'dispatch'):
+            if inspect.isawaitable(response):
+                response = await response
+    except HttpError as e:
+        response = HttpResponse(status=e.status)
+    return instrumentation.finish(request, response)
@@ -1,12 +1,42 @@
-from datetime import datetime
+import time
+from functools import update_wrapper
+try:
+    from hmac import compare_digest
+except ImportError:
+    # Python < 2.7.7
+    from django.utils.crypto import constant_time_compare as compare_digest
 
+from django.conf import settings
 from django.http import HttpResponse
 
 from .signature import calculate_signature
-from ..utils.decorators import wrap_object
+from .. import instrumentation
+from ..cache import get_cache
+from ..parsers import read_body
+from ..utils.cache import LRUCache
+from ..utils.compat import force_bytes
+from ..utils.decorators import stage_decorator, wrap_object
 from ..exceptions import HttpError
 
 
+# The number of seconds a signature remains valid, before or after its
+# timestamp
+SIGNATURE_TIMEOUT = 5 * 60
+
+# The maximum number of signatures remembered by the in-process replay cache
+REPLAY_CACHE_SIZE = 100000
+
+# The default number of seconds, and the default maximum number of clients,
+# for which cached_secret_key remembers secret keys
+SECRET_KEY_CACHE_TIMEOUT = 5 * 60
+SECRET_KEY_CACHE_SIZE = 1024
+
+# The mimetypes of the message bodies whose parameters are signed one by one
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+_replay_cache = LRUCache(REPLAY_CACHE_SIZE, 2 * SIGNATURE_TIMEOUT)
+
+
 def auth_required(secret_key_func):
     """
     Requires that the user be authenticated either by a signature or by
@@ -16,7 +46,7 @@ def auth_required(secret_key_func):
 
         def test_func(request, *args, **kwargs):
             secret_key = secret_key_func(request, *args, **kwargs)
-            return validate_signature(request, secret_key) or request.user.is_authenticated()
+            return validate_signature(request, secret_key) or is_authenticated(request.user)
 
         decorator = request_passes_test(test_func)
         return wrap_object(obj, decorator)
@@ -29,7 +59,7 @@ def login_required(obj):
     Requires that the user be logged in order to gain access to the resource
     at the specified the URI.
     """
-    decorator = request_passes_test(lambda r, *args, **kwargs: r.user.is_authenticated())
+    decorator = request_passes_test(lambda r, *args, **kwargs: is_authenticated(r.user))
     return wrap_object(obj, decorator)
 
 
@@ -58,6 +88,56 @@ def signature_required(secret_key_func):
     return actual_decorator
 
 
+def cached_secret_key(client_id_func, timeout=SECRET_KEY_CACHE_TIMEOUT, maxsize=SECRET_KEY_CACHE_SIZE):
+    """
+    Caches the secret keys returned by a secret key function.
+
+    Looking up a client's secret key usually means a trip to the database, so
+    this decorator remembers the secret key returned for each client for
+    timeout seconds, keeping at most maxsize clients' keys at a time. The
+    client is identified by client_id_func, which takes the same arguments as
+    the secret key function (an HttpRequest object and any number of
+    positional and keyword arguments as defined by the urlconf entry for the
+    resource) and returns a hashable identifier, or None if the client can't
+    be identified, in which case the secret key function is always called.
+
+    The decorated function has two extra methods: revoke, which takes a client
+    identifier and forgets the secret key cached for that client, and clear,
+    which forgets all of the secret keys that have been cached. For example:
+
+        @cached_secret_key(lambda request, *args, **kwargs: request.GET.get('client'))
+        def secret_key(request, *args, **kwargs):
+            return ApiClient.objects.get(name=request.GET.get('client')).secret_key
+
+        @signature_required(secret_key)
+        class Contacts(Resource):
+            ...
+
+        # When a client's secret key is changed
+        secret_key.revoke('some-client')
+    """
+    def decorator(secret_key_func):
+        cache = LRUCache(maxsize, timeout)
+
+        def wrapper(request, *args, **kwargs):
+            client_id = client_id_func(request, *args, **kwargs)
+            if client_id is None:
+                return secret_key_func(request, *args, **kwargs)
+
+            secret_key = cache.get(client_id)
+            if secret_key is None:
+                secret_key = secret_key_func(request, *args, **kwargs)
+                if secret_key is not None:
+                    cache.set(client_id, secret_key)
+            return secret_key
+
+        wrapper.revoke = cache.delete
+        wrapper.clear = cache.clear
+        return update_wrapper(wrapper, secret_key_func)
+
+    return decorator
+
+
 def request_passes_test(test_func, message=None, status=401):
     """
     Decorator for resources that checks that the request passes the given test.
@@ -66,54 +146,116 @@ def request_passes_test(test_func, message=None, status=401):
     takes an HttpRequest object and any number of positional and keyword
     arguments as defined by the urlconf entry for the decorated resource.
     """
-    def decorator(view_func):
-        def _wrapped_view(request, *args, **kwargs):
-            if not test_func(request, *args, **kwargs):
-                raise HttpError(message=message, status=status)
-            return view_func(request, *args, **kwargs)
-        return _wrapped_view
-    return decorator
+    def check(request, *args, **kwargs):
+        with instrumentation.timer(request, 'auth'):
+            passed = test_func(request, *args, **kwargs)
+        if not passed:
+            instrumentation.incr('auth_failures', request=request)
+            raise HttpError(message=message, status=status)
+        return None, None
+
+    return stage_decorator(before=check)
 
 
 def validate_signature(request, secret_key):
     """
     Validates the signature associated with the given request.
+
+    A signature is only valid if it was calculated with the secret key from
+    the request's parameters (and the hash of its message body, unless the
+    body is form encoded; see calculate_signature) less than
+    SIGNATURE_TIMEOUT seconds ago (or in the future, to allow for clock drift
+    between the client and the server).
+    Unless the SIMPLE_REST_REPLAY_CACHE setting is None, each signature is
+    also only accepted once (see check_replay).
+
+    The sub-requests of a batch request (see simple_rest.batch) don't carry
+    a signature of their own. Instead, they're valid if the batch request's
+    signature was valid and checked against the same secret key. The batch
+    request's body, which lists the sub-requests, is JSON, so its hash is
+    part of that signature, and a signed batch can't be altered to run any
+    other sub-requests.
     """
+    if getattr(request, 'batch_request', None) is not None:
+        signed_with = getattr(request.batch_request, '_simple_rest_signed_with', None)
+        return (signed_with is not None and secret_key is not None and
+                compare_digest(force_bytes(signed_with), force_bytes(secret_key)))
 
-    # Extract the request parameters according to the HTTP method
-    data = request.GET.copy()
+    # Extract the request parameters according to the HTTP method, without
+    # copying the QueryDicts. Parameters in a form encoded message body take
+    # precedence over those with the same name in the querystring, while any
+    # other message body (e.g., JSON) is signed as a whole, by its hash.
+    data = dict(request.GET.items())
+    body = None
     if request.method != 'GET':
-        message_body = getattr(request, request.method, {})
-        data.update(message_body)
-
-    # Make sure the request contains a signature
-    if data.get('sig', False):
-        sig = data['sig']
-        del data['sig']
-    else:
-        return False
+        if get_content_type(request) in FORM_CONTENT_TYPES:
+            data.update(request.POST.items())
+        else:
+            body = read_body(request)
 
-    # Make sure the request contains a timestamp
-    if data.get('t', False):
-        timestamp = int(data.get('t', False))
-        del data['t']
-    else:
+    # Make sure the request contains a signature and a timestamp
+    sig = data.pop('sig', None)
+    timestamp = data.pop('t', None)
+    if not sig or not timestamp:
+        return False
+    try:
+        timestamp = int(timestamp)
+    except ValueError:
         return False
 
-    # Make sure the signature has not expired
-    local_time = datetime.utcnow()
-    remote_time = datetime.utcfromtimestamp(timestamp)
-    
-    
-    # this stops a bug if the client clock is ever a little ahead of 
-    # the server clock.  Makes the window of acceptable time current +/- 5 mins
-    if local_time > remote_time:
-        delta = local_time - remote_time
-    else:   
-        delta = remote_time - local_time
-    
-    if delta.seconds > 5 * 60:  # If the signature is older than 5 minutes, it's invalid
+    # Make sure the signature has not expired. The window of acceptable time
+    # is current +/- 5 mins, which stops a bug if the client clock is ever a
+    # little ahead of the server clock.
+    if abs(time.time() - timestamp) > SIGNATURE_TIMEOUT:
         return False
 
     # Make sure the signature is valid
-    return sig == calculate_signature(secret_key, data, timestamp)
+    signature = calculate_signature(secret_key, data, timestamp, body)
+    if not compare_digest(force_bytes(sig), force_bytes(signature)):
+        return False
+
+    # Finally, make sure the signature hasn't been used before
+    if not check_replay(sig, timestamp):
+        return False
+    request._simple_rest_signed_with = secret_key
+    return True
+
+
+def is_authenticated(user):
+    """
+    Returns True if the user is logged in
+
+    is_authenticated is a method before Django 1.10 and a property after.
+    """
+    authenticated = user.is_authenticated
+    if callable(authenticated):
+        return authenticated()
+    return authenticated
+
+
+def get_content_type(request):
+    return request.META.get('CONTENT_TYPE', '').split(';')[0].strip().lower()
+
+
+def check_replay(sig, timestamp):
+    """
+    Records the use of a signature and returns False if it was already used.
+
+    Signatures are recorded in the cache named by the SIMPLE_REST_REPLAY_CACHE
+    setting. By default, the setting is 'local', which records the signatures
+    in a bounded, in-process cache that is only shared by the threads of a
+    single process. Set it to the alias of a Django cache (e.g., 'default')
+    to share the record between processes, or to None to turn off replay
+    protection entirely.
+    """
+    cache_alias = getattr(settings, 'SIMPLE_REST_REPLAY_CACHE', 'local')
+    if cache_alias is None:
+        return True
+
+    # A signature is valid from SIGNATURE_TIMEOUT seconds before its timestamp
+    # until SIGNATURE_TIMEOUT seconds after, so it has to be remembered for
+    # twice that long
+    key = 'simple_rest:signature:%s:%s' % (timestamp, sig)
+    if cache_alias == 'local':
+        return _replay_cache.add(key, True)
+    return get_cache(cache_alias).add(key, True, 2 * SIGNATURE_TIMEOUT)
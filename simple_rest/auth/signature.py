@@ -2,19 +2,63 @@ import time
 import hmac
 import hashlib
 
+from ..utils.cache import LRUCache
+from ..utils.compat import force_bytes
 
-def calculate_signature(key, data, timestamp=None):
+
+# The query parameters that carry the signature and its timestamp, which are
+# left out of anything else built from a request's parameters (e.g., the
+# links to other pages or the key of a cached response)
+SIGNATURE_PARAMS = ('sig', 't')
+
+# The name of the parameter that holds the hash of a message body that isn't
+# form encoded when the signature is calculated
+BODY_HASH_PARAM = 'body_sha256'
+
+# The maximum number of secret keys that have an HMAC object prepared for them
+PREPARED_KEY_CACHE_SIZE = 1024
+
+_prepared_keys = LRUCache(PREPARED_KEY_CACHE_SIZE)
+
+
+def calculate_signature(key, data, timestamp=None, body=None):
     """
     Calculates the signature for the given request data.
+
+    A message body that isn't form encoded (e.g., JSON) is signed by passing
+    its raw bytes as body, whose SHA-256 hex digest is then signed along with
+    the data as the BODY_HASH_PARAM parameter.
     """
     # Create a timestamp if one was not given
     if timestamp is None:
         timestamp = int(time.time())
 
+    if body:
+        data = dict(data)
+        data[BODY_HASH_PARAM] = hashlib.sha256(force_bytes(body)).hexdigest()
+
     # Construct the message from the timestamp and the data in the request
-    message = str(timestamp) + ''.join("%s%s" % (k,v) for k,v in sorted(data.items()))
+    message = '%s%s' % (timestamp, ''.join(['%s%s' % item for item in sorted(data.items())]))
 
     # Calculate the signature (HMAC SHA256) according to RFC 2104
-    signature = hmac.HMAC(str(key), message, hashlib.sha256).hexdigest()
+    mac = prepare_key(key).copy()
+    mac.update(force_bytes(message))
+    signature = mac.hexdigest()
 
     return signature
+
+
+def prepare_key(key):
+    """
+    Returns an HMAC object for the given secret key that has yet to be fed
+    a message.
+
+    Keying an HMAC object hashes the padded key twice, so the objects are
+    cached for the most recently used keys and must be copied before use.
+    """
+    key = force_bytes(key)
+    mac = _prepared_keys.get(key)
+    if mac is None:
+        mac = hmac.new(key, digestmod=hashlib.sha256)
+        _prepared_keys.set(key, mac)
+    return mac
@@ -0,0 +1,221 @@
+import copy
+import json
+import logging
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    # Python 2
+    from urlparse import urlsplit
+
+from django.db import connections
+from django.http import QueryDict
+try:
+    from django.urls import Resolver404, resolve
+except ImportError:
+    # Django < 1.10
+    from django.core.urlresolvers import Resolver404, resolve
+
+from .auth.signature import SIGNATURE_PARAMS
+from .exceptions import HttpError
+from .resource import Resource
+from .response import RESTfulResponse
+from .utils.compat import force_bytes, force_text
+
+logger = logging.getLogger(__name__)
+
+
+# The default maximum number of requests in a single batch
+MAX_REQUESTS = 25
+
+# Headers of the batch request that are never passed on to its sub-requests.
+# Sub-requests always ask for uncompressed JSON, which is decoded and placed
+# in the batch response.
+IGNORED_HEADERS = ('HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+_methods = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS')
+
+
+@RESTfulResponse()
+class Batch(Resource):
+    """
+    Runs many requests to other resources in a single round trip
+
+    The message body of a POST to a batch resource is a JSON array of
+    requests, each an object holding the method, the path (with an optional
+    querystring), and, for requests that send one, the JSON body of the
+    request. Every request is resolved through the URLconf and run through
+    the resource it resolves to, decorators and all, and the response to the
+    batch holds the status, headers, and (decoded) body of every response,
+    in order, rendered in whatever format the batch request negotiated:
+
+        [{"method": "GET", "path": "/contacts/1/"},
+         {"method": "PUT", "path": "/contacts/2/", "body": {"fname": "Julia"}}]
+
+    Each sub-request is a copy of the batch request, so it shares the
+    batch request's user and headers, and gets any of its query parameters
+    (other than the signature parameters) that it doesn't set itself. To
+    authenticate the batch as a whole, decorate a subclass with any of the
+    auth decorators. A sub-request is then signed if the batch request was
+    signed with the same secret key the sub-request's resource would have
+    checked it against (see validate_signature), so clients sign just the
+    one request. Its signature covers the hash of its body (see
+    calculate_signature), so none of the sub-requests can be changed
+    without invalidating it.
+
+    Consecutive GET requests are independent of each other, so up to
+    max_workers of them are run at a time on a thread pool. Any other
+    request waits for the ones before it to finish, and the requests after
+    it wait for it. Since each thread uses its own database connection, set
+    max_workers to 0 (or 1) if GETs must see uncommitted changes made
+    earlier in the batch (e.g., with ATOMIC_REQUESTS turned on).
+    """
+    max_requests = MAX_REQUESTS
+    max_workers = 4
+
+    def post(self, request, *args, **kwargs):
+        if getattr(request, 'batch_request', None) is not None:
+            raise HttpError('Batch requests cannot be nested', status=400)
+
+        items = request.POST
+        if not isinstance(items, list):
+            raise HttpError('Expected a JSON array of requests', status=400)
+        if len(items) > self.max_requests:
+            raise HttpError('A batch cannot hold more than %d requests' % self.max_requests, status=400)
+
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            if isinstance(item, dict) and str(item.get('method', 'GET')).upper() == 'GET':
+                pending.append(index)
+                continue
+            self.run_concurrently(request, items, pending, results)
+            pending = []
+            results[index] = self.run(request, item)
+        self.run_concurrently(request, items, pending, results)
+        return results
+
+    def run_concurrently(self, request, items, indexes, results):
+        """
+        Runs the requests at the given indexes at the same time, up to
+        max_workers at a time
+        """
+        if len(indexes) < 2 or self.max_workers < 2:
+            for index in indexes:
+                results[index] = self.run(request, items[index])
+            return
+
+        def run_in_thread(index):
+            try:
+                return self.run(request, items[index])
+            finally:
+                # Every thread opens its own connections, which would
+                # otherwise be left open once the pool is done with it
+                for connection in connections.all():
+                    connection.close()
+
+        pool = ThreadPool(min(self.max_workers, len(indexes)))
+        try:
+            for index, result in zip(indexes, pool.map(run_in_thread, indexes)):
+                results[index] = result
+        finally:
+            pool.terminate()
+
+    def run(self, request, item):
+        """
+        Runs a single request of the batch and returns its result
+        """
+        try:
+            sub_request, match = make_sub_request(request, item)
+        except HttpError as e:
+            return {'status': e.status, 'headers': {}, 'body': e.message and {'error': e.message}}
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception('Error running %s %s in a batch', sub_request.method, sub_request.path)
+            return {'status': 500, 'headers': {}, 'body': None}
+        return {
+            'status': response.status_code,
+            'headers': dict(response.items()),
+            'body': get_body(response),
+        }
+
+
+def make_sub_request(request, item):
+    """
+    Returns a copy of the request for an item of a batch, and the URLconf
+    entry it resolves to
+    """
+    if not isinstance(item, dict) or not item.get('path'):
+        raise HttpError('Every request needs a path', status=400)
+    method = str(item.get('method', 'GET')).upper()
+    if method not in _methods:
+        raise HttpError('Unsupported method: %s' % method, status=405)
+
+    path, query = urlsplit(item['path'])[2:4]
+    try:
+        match = resolve(path)
+    except Resolver404:
+        raise HttpError('Not found: %s' % path, status=404)
+
+    params = QueryDict(query, mutable=True)
+    for name, values in request.GET.lists():
+        if name not in params and name not in SIGNATURE_PARAMS:
+            params.setlist(name, values)
+    params._mutable = False
+
+    body = b''
+    if item.get('body') is not None:
+        body = force_bytes(json.dumps(item['body']))
+
+    meta = dict(request.META)
+    for name in IGNORED_HEADERS:
+        meta.pop(name, None)
+    meta.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': params.urlencode(),
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_TYPE': body and 'application/json' or '',
+        'CONTENT_LENGTH': str(len(body)),
+    })
+
+    # Start from a copy so that the sub-request keeps the batch request's
+    # user, session, and the result of its authentication, but forget
+    # everything that was read from, or attached to, the batch request's
+    # message body
+    sub_request = copy.copy(request)
+    for name in ('_post', '_files', '_body', '_load_post_and_files', '_simple_rest_timings'):
+        sub_request.__dict__.pop(name, None)
+    sub_request.environ = sub_request.META = meta
+    sub_request.method = method
+    script_name = request.path[:len(request.path) - len(request.path_info)]
+    sub_request.path = script_name + path
+    sub_request.path_info = path
+    sub_request.GET = params
+    sub_request._body = body
+    sub_request._stream = BytesIO(body)
+    sub_request._read_started = False
+    sub_request.resolver_match = match
+    sub_request.batch_request = request
+    return sub_request, match
+
+
+def get_body(response):
+    """
+    Returns the body of a response to a sub-request, decoded if it's JSON
+    """
+    if getattr(response, 'streaming', False):
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    if not content:
+        return None
+    if response.get('Content-Type', '').split(';')[0].strip() == 'application/json':
+        try:
+            return json.loads(force_text(content))
+        except ValueError:
+            pass
+    return force_text(content)
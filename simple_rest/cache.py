@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from django.http import HttpResponse
+try:
+    from django.core.cache import caches
+    get_cache = lambda alias: caches[alias]
+except ImportError:
+    # Django < 1.7
+    from django.core.cache import get_cache
+
+from . import instrumentation
+from .auth.signature import SIGNATURE_PARAMS
+from .utils.cache import LRUCache
+from .utils.compression import negotiate_encoding
+from .utils.decorators import stage_decorator, wrap_object
+
+
+# HTTP methods that change a resource and, as a result, invalidate all of the
+# responses cached for it
+MUTATING_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# The default number of responses held in each resource's in-process cache
+LOCAL_CACHE_SIZE = 256
+
+
+def cache_response(timeout=None, key_prefix=None, cache_alias='default', vary_on_user=False,
+                   ignore_params=SIGNATURE_PARAMS, local_maxsize=LOCAL_CACHE_SIZE, local_timeout=None):
+    """
+    Caches the responses to GET requests for a resource.
+
+    Responses are cached in the Django cache named by cache_alias for timeout
+    seconds (or the cache's default timeout) and in a small, in-process LRU
+    cache of local_maxsize entries that expire after local_timeout seconds (or
+    timeout seconds if not given). Setting local_maxsize to 0 turns the
+    in-process cache off.
+
+    A response is cached under a key made from the path of the request, its
+    sorted query parameters (less ignore_params, which by default are the
+    signature parameters), the Accept header and format override that drive
+    content negotiation, the content coding negotiated from the
+    Accept-Encoding header (so compressed bodies are cached, and served,
+    as is), and, if vary_on_user is True, the logged in user.
+    Only successful responses are cached, so this decorator should be applied
+    above any RESTfulResponse decorator and below any authentication ones.
+
+    Every key also contains a version number that is shared by all of the
+    responses cached for a resource. Successful POST, PUT, PATCH, and DELETE
+    requests to the resource bump the version, and with it, evict all of the
+    responses cached for the resource. The version is stored under key_prefix,
+    which defaults to the dotted path of the decorated class, and can also be
+    bumped by hand by calling invalidate with the same key_prefix. Since
+    methods cannot be told apart by their dotted path, pass a key_prefix when
+    decorating individual methods.
+    """
+    def actual_decorator(obj):
+        prefix = key_prefix or '%s.%s' % (obj.__module__, obj.__name__)
+        local_cache = None
+        if local_maxsize:
+            local_cache = LRUCache(local_maxsize, local_timeout or timeout)
+
+        def lookup(request, *args, **kwargs):
+            """
+            Returns the key the response to the request is cached under, and
+            the cached response, if there is one
+            """
+            if request.method != 'GET':
+                return None, None
+
+            cache = get_cache(cache_alias)
+            key = _response_cache_key(request, prefix, _get_version(cache, prefix),
+                                      vary_on_user, ignore_params, kwargs.get('_format'))
+            entry = local_cache.get(key) if local_cache is not None else None
+            if entry is None:
+                entry = cache.get(key)
+                if entry is not None and local_cache is not None:
+                    local_cache.set(key, entry)
+            if entry is not None:
+                instrumentation.incr('cache_hits', request=request)
+                return key, _response_from_entry(entry)
+
+            instrumentation.incr('cache_misses', request=request)
+            return key, None
+
+        def store(request, key, response):
+            """
+            Caches the response to a GET request under the key returned by
+            lookup, or invalidates the cached responses after a change
+            """
+            if request.method in MUTATING_METHODS:
+                if not isinstance(response, HttpResponse) or response.status_code < 400:
+                    invalidate(prefix, cache_alias)
+            elif (key is not None and isinstance(response, HttpResponse) and
+                    response.status_code == 200 and not getattr(response, 'streaming', False)):
+                entry = (response.status_code, response.content, list(response.items()))
+                cache = get_cache(cache_alias)
+                if timeout is None:
+                    cache.set(key, entry)
+                else:
+                    cache.set(key, entry, timeout)
+                if local_cache is not None:
+                    local_cache.set(key, entry)
+            return response
+
+        decorator = stage_decorator(before=lookup, after=store)
+        return wrap_object(obj, decorator)
+
+    return actual_decorator
+
+
+def invalidate(key_prefix, cache_alias='default'):
+    """
+    Evicts all of the responses cached for the resource with the given prefix
+    """
+    cache = get_cache(cache_alias)
+    version_key = _version_key(key_prefix)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # The version isn't in the cache, so start a new one
+        cache.set(version_key, _new_version())
+
+
+def _get_version(cache, key_prefix):
+    version_key = _version_key(key_prefix)
+    version = cache.get(version_key)
+    if version is None:
+        # Versions start from the current time, rather than 1, so that any
+        # responses cached under an evicted version are never served again
+        version = _new_version()
+        if not cache.add(version_key, version):
+            version = cache.get(version_key, version)
+    return version
+
+
+def _new_version():
+    return int(time.time() * 1000)
+
+
+def _version_key(key_prefix):
+    return 'simple_rest:version:%s' % key_prefix
+
+
+def _response_cache_key(request, key_prefix, version, vary_on_user, ignore_params, format):
+    params = sorted((k, v) for k, v in request.GET.lists() if k not in ignore_params)
+    # Anonymous users don't have a primary key
+    user = None
+    if vary_on_user:
+        user = request.user.pk
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    parts = (request.path, params, request.META.get('HTTP_ACCEPT', ''), format, encoding, user)
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return 'simple_rest:response:%s:%s:%s' % (key_prefix, version, digest)
+
+
+def _response_from_entry(entry):
+    status, content, headers = entry
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
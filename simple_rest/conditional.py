@@ -0,0 +1,88 @@
+import calendar
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from .utils.decorators import stage_decorator, wrap_object
+
+# Django 1.11 and later leave the quotes (and any W/ prefix) on the ETags
+# that parse_etags returns, while earlier versions strip them
+_QUOTED_ETAGS = parse_etags('"x"') == ['"x"']
+
+
+def condition(etag_func=None, last_modified_func=None):
+    """
+    Adds support for conditional GET requests to a resource.
+
+    Both etag_func and last_modified_func take an HttpRequest object and any
+    number of positional and keyword arguments as defined by the urlconf
+    entry for the decorated resource. etag_func should return the (unquoted)
+    ETag of the resource and last_modified_func a UTC datetime of the last
+    time the resource was modified, and either can return None if the value
+    is unknown. Both functions are called before the view, so if the client
+    already has the current version of the resource a 304 (Not Modified)
+    response is returned without ever running the view.
+
+    When used along with a RESTfulResponse decorator, this decorator must be
+    applied after (i.e., above) it so that the ETag and Last-Modified headers
+    are added to the final response.
+    """
+    def validators(request, *args, **kwargs):
+        """
+        Returns the ETag and last modified time of the resource, and a 304
+        (Not Modified) response if the client's copy is still current
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+
+        etag = etag_func and etag_func(request, *args, **kwargs)
+        last_modified = last_modified_func and last_modified_func(request, *args, **kwargs)
+        if last_modified:
+            last_modified = calendar.timegm(last_modified.utctimetuple())
+
+        response = None
+        if not_modified(request, etag, last_modified):
+            response = add_validators(request, (etag, last_modified), HttpResponseNotModified())
+        return (etag, last_modified), response
+
+    def add_validators(request, state, response):
+        if state is not None and isinstance(response, HttpResponse) and response.status_code in (200, 304):
+            etag, last_modified = state
+            if etag and not response.has_header('ETag'):
+                response['ETag'] = quote_etag(etag)
+            if last_modified and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def actual_decorator(obj):
+        return wrap_object(obj, stage_decorator(before=validators, after=add_validators))
+
+    return actual_decorator
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    Returns True if the client's copy of the resource is still current.
+
+    The (unquoted) ETag is checked against the If-None-Match header and the
+    last modified time, in seconds since the epoch, against the
+    If-Modified-Since header. As the HTTP spec requires, If-Modified-Since is
+    ignored whenever If-None-Match is present.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        if not etag:
+            return False
+        etags = parse_etags(if_none_match)
+        if _QUOTED_ETAGS:
+            # If-None-Match uses the weak comparison, so W/"x" matches "x"
+            etags = [tag[2:] if tag.startswith('W/') else tag for tag in etags]
+            etag = quote_etag(etag)
+        return '*' in etags or etag in etags
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since and last_modified:
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+    return False
@@ -1,6 +1,8 @@
 class HttpError(Exception):
     def __init__(self, message=None, status=500):
         super(HttpError, self).__init__(message)
+        # BaseException.message is deprecated as of Python 2.6
+        self.message = message
         self.status = status
 
     def __repr__(self):
@@ -1,6 +1,42 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.forms import ModelForm as DjangoModelForm
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.fields import NOT_PROVIDED
+try:
+    atomic = transaction.atomic
+except AttributeError:
+    # Django < 1.6
+    atomic = transaction.commit_on_success
+
+from .utils.compat import force_text
+
+
+# The default number of objects created with a single query by bulk_save
+BULK_BATCH_SIZE = 500
+
+# Maps each model to the (name, attname, get_default) tuples of its fields
+_model_fields = {}
+
+
+def get_model_fields(model):
+    """
+    Returns the name, attribute name, and default of each of the model's fields
+
+    The attribute name is the name the field's value is stored under on a
+    model instance, which for foreign keys is the name of the column holding
+    the primary key of the related object (e.g., author_id), so reading it
+    never fetches the related object from the database. The default is the
+    field's get_default method, which calls callable defaults each time it's
+    called, or None if the field doesn't have a default.
+
+    The list is only built once per model, rather than every time a form is
+    created.
+    """
+    fields = _model_fields.get(model)
+    if fields is None:
+        fields = [(field.name, field.attname, field.get_default if field.has_default() else None)
+                  for field in model._meta.fields]
+        _model_fields[model] = fields
+    return fields
 
 
 class ModelForm(DjangoModelForm):
@@ -27,6 +63,8 @@ class ModelForm(DjangoModelForm):
     instance, if one has been provided.
     Note: this has not yet been tested, and likely does not work, on
     many-to-many relationships.
+
+    Many objects can also be validated and saved at once with bulk_save.
     """
 
     def __init__(self, *args, **kwargs):
@@ -34,23 +72,94 @@ class ModelForm(DjangoModelForm):
 
         # Make sure the data is editable and that we are not altering the
         # original object
-        data = {}
-        for k, v in self.data.items():
-            data[k] = v
-        self.data = data
-
-        for field in self.instance.__class__._meta.fields:
-            if field.name not in self.data.keys() or self.data.get(field.name) == None:
-                inst_val = None
-                if self.instance.id:
-                    try:
-                        inst_val = getattr(self.instance, field.name)
-                        #Get the ID if this is a model object and
-                        #we're dealing with a foreign key
-                        #relationship.
-                        inst_val = getattr(inst_val, 'id')
-                    except (AttributeError, ObjectDoesNotExist):
-                        pass
-                    self.data[field.name] = inst_val
-                elif field.default != NOT_PROVIDED:
-                    self.data[field.name] = field.default
+        self.data = data = dict(self.data.items())
+
+        # Fill in the missing values from the instance, if there is one, or
+        # from the defaults of the model otherwise. Foreign keys are read
+        # through their attribute name (e.g., author_id) so that the related
+        # objects aren't fetched just to get their primary keys.
+        instance = self.instance
+        for name, attname, get_default in get_model_fields(instance.__class__):
+            if data.get(name) is None:
+                if instance.pk:
+                    data[name] = getattr(instance, attname, None)
+                elif get_default is not None:
+                    data[name] = get_default()
+
+    @classmethod
+    def bulk_save(cls, items, batch_size=BULK_BATCH_SIZE):
+        """
+        Validates and saves a list of objects (e.g., a JSON array) at once
+
+        Each item is a dict of the data for one object. Items holding the
+        primary key of an existing object update that object, while all of
+        the other items create new objects. The existing objects are read
+        with a single query, the new objects are created with bulk_create,
+        batch_size at a time, and everything is written in one transaction.
+
+        Returns a (objects, errors) tuple. If every item is valid, objects
+        holds the saved objects, in the order of the items, and errors is
+        empty. Otherwise, nothing is saved, objects is empty, and errors maps
+        the index of each invalid item (including one whose primary key isn't
+        valid, or doesn't exist) to its errors. Objects created with
+        bulk_create only have their primary key set if the database backend
+        returns it (e.g., PostgreSQL on Django 1.10 or later), so the others
+        are returned with a primary key of None.
+        """
+        items = list(items)
+        model = cls._meta.model
+        pk_field = model._meta.pk
+        pk_name = pk_field.name
+
+        # The primary keys sent by the client may not be of the same type
+        # (e.g., strings rather than integers) as the ones in_bulk returns,
+        # so they're converted the way the primary key field converts them
+        pks, errors = {}, {}
+        for index, item in enumerate(items):
+            if isinstance(item, dict) and item.get(pk_name):
+                try:
+                    pks[index] = pk_field.to_python(item[pk_name])
+                except ValidationError as e:
+                    errors[index] = {pk_name: e.messages}
+        existing = {}
+        if pks:
+            existing = dict((force_text(pk), obj)
+                            for pk, obj in model._default_manager.in_bulk(list(set(pks.values()))).items())
+
+        forms = []
+        for index, item in enumerate(items):
+            if index in errors:
+                continue
+            if not isinstance(item, dict):
+                errors[index] = {'__all__': ['Expected an object']}
+                continue
+            instance = None
+            if index in pks:
+                instance = existing.get(force_text(pks[index]))
+                if instance is None:
+                    errors[index] = {pk_name: ['Object does not exist']}
+                    continue
+            form = cls(item, instance=instance)
+            if form.is_valid():
+                forms.append(form)
+            else:
+                errors[index] = form.errors
+        if errors:
+            return [], errors
+
+        objects = [form.save(commit=False) for form in forms]
+        with atomic():
+            # Objects need a primary key before their many-to-many relations
+            # can be saved, which bulk_create doesn't set
+            if model._meta.many_to_many:
+                created = []
+            else:
+                created = [obj for obj in objects if obj.pk is None]
+                model._default_manager.bulk_create(created, batch_size=batch_size)
+            created_ids = set(id(obj) for obj in created)
+            for form, obj in zip(forms, objects):
+                if id(obj) not in created_ids:
+                    obj.save()
+                    form.save_m2m()
+        return objects, {}
+
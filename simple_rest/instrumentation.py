@@ -0,0 +1,160 @@
+import logging
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+try:
+    from importlib import import_module
+except ImportError:
+    # Python 2.6
+    from django.utils.importlib import import_module
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Collector(object):
+    """
+    Receives the timings and counters recorded while requests are handled
+
+    To send them somewhere (e.g., to statsd), subclass this class, override
+    timing and incr, and set the SIMPLE_REST_COLLECTOR setting to the dotted
+    path of the subclass. A single instance of the collector is shared by
+    every request (and thread), so it shouldn't keep any per-request state
+    on itself.
+
+    The phases timed are 'dispatch' (everything Resource.dispatch does),
+    'body' (parsing the message body), 'auth' (the tests run by the auth
+    decorators), 'view' (the view itself), 'negotiate' (content negotiation),
+    'render' (rendering the response), and 'compress' (compressing the
+    response). The phases overlap, e.g., the message body is usually parsed
+    while the view runs. The counters are 'bytes_rendered',
+    'rows_serialized', 'cache_hits', 'cache_misses', and 'auth_failures'.
+    Counters that are recorded outside of a request (e.g., rows_serialized)
+    are passed None as the request.
+    """
+    def timing(self, request, phase, seconds):
+        pass
+
+    def incr(self, request, name, value):
+        pass
+
+
+class LoggingCollector(Collector):
+    """
+    Logs every timing and counter at the DEBUG level
+    """
+    def timing(self, request, phase, seconds):
+        logger.debug('%s %s: %.3f ms', _path(request), phase, seconds * 1000)
+
+    def incr(self, request, name, value):
+        logger.debug('%s %s: +%s', _path(request), name, value)
+
+
+def _path(request):
+    return getattr(request, 'path', '-')
+
+
+class _Timer(object):
+    __slots__ = ('request', 'phase', 'start')
+
+    def __init__(self, request, phase):
+        self.request = request
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_timing(self.request, self.phase, default_timer() - self.start)
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_null_timer = _NullTimer()
+
+# The configured collector (or None) and whether or not the Server-Timing
+# header is turned on, once they've been read from the settings
+_state = None
+
+
+def _get_state():
+    global _state
+    if _state is None:
+        collector = None
+        path = getattr(settings, 'SIMPLE_REST_COLLECTOR', None)
+        if path:
+            module_name, class_name = path.rsplit('.', 1)
+            try:
+                collector = getattr(import_module(module_name), class_name)()
+            except (ImportError, AttributeError) as e:
+                raise ImproperlyConfigured('Error importing collector %s: "%s"' % (path, e))
+        _state = (collector, getattr(settings, 'SIMPLE_REST_SERVER_TIMING', False))
+    return _state
+
+
+def is_enabled():
+    """
+    Returns True if anything is recorded, i.e., if a collector is configured
+    or the Server-Timing header is turned on
+    """
+    collector, server_timing = _get_state()
+    return collector is not None or server_timing
+
+
+def timer(request, phase):
+    """
+    Returns a context manager that records how long its block takes to run
+
+    When nothing is being recorded, a shared context manager that does
+    nothing is returned, so timing a phase costs next to nothing.
+    """
+    if not is_enabled():
+        return _null_timer
+    return _Timer(request, phase)
+
+
+def record_timing(request, phase, seconds):
+    collector, server_timing = _get_state()
+    if collector is not None:
+        collector.timing(request, phase, seconds)
+    if server_timing and request is not None:
+        timings = request.__dict__.setdefault('_simple_rest_timings', OrderedDict())
+        timings[phase] = timings.get(phase, 0) + seconds
+
+
+def incr(name, value=1, request=None):
+    """
+    Adds the value to the named counter
+    """
+    collector = _get_state()[0]
+    if collector is not None:
+        collector.incr(request, name, value)
+
+
+def finish(request, response):
+    """
+    Adds the phases timed for the request to the response's Server-Timing
+    header, if the SIMPLE_REST_SERVER_TIMING setting is True
+    """
+    timings = request.__dict__.get('_simple_rest_timings')
+    if not timings or not _get_state()[1]:
+        return response
+
+    header = ', '.join('%s;dur=%.3f' % (phase, seconds * 1000) for phase, seconds in timings.items())
+    if response.has_header('Server-Timing'):
+        header = '%s, %s' % (response['Server-Timing'], header)
+    response['Server-Timing'] = header
+    return response
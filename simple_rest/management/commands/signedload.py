@@ -0,0 +1,279 @@
+from optparse import make_option
+import calendar, datetime
+import math
+import threading
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
+try:
+    from urllib import urlencode
+    from urllib2 import HTTPError, Request, URLError, urlopen
+except ImportError:
+    # Python 3
+    from urllib.error import HTTPError, URLError
+    from urllib.parse import urlencode
+    from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import Client
+from ...auth.signature import calculate_signature
+
+
+# The number of requests signed by a worker process at a time
+CHUNK_SIZE = 1000
+
+# The percentiles of the latency reported by replay
+PERCENTILES = (50, 90, 99)
+
+# The (flags, keyword arguments) of each of the command's options
+OPTIONS = (
+    (('--secret-key',), dict(
+        dest='secret-key',
+        action='store',
+        help='Sign the requests with the secret key')),
+    (('--method',), dict(
+        dest='method',
+        default='GET',
+        help='The HTTP method of the requests (default: GET)')),
+    (('--path',), dict(
+        dest='path',
+        default='/',
+        help='The path of the requests (default: /)')),
+    (('--count',), dict(
+        dest='count',
+        type=int,
+        default=1000,
+        help='The number of requests to generate (default: 1000)')),
+    (('--processes',), dict(
+        dest='processes',
+        type=int,
+        default=1,
+        help='The number of processes that sign the requests (default: 1)')),
+    (('--timestamp',), dict(
+        dest='timestamp',
+        type=int,
+        help='The timestamp to sign the requests with (default: now)')),
+    (('--output',), dict(
+        dest='output',
+        help='Write the requests to this file (default: stdout)')),
+    (('--concurrency',), dict(
+        dest='concurrency',
+        type=int,
+        default=1,
+        help='The number of requests replayed at a time (default: 1)')),
+    (('--url',), dict(
+        dest='url',
+        help='Replay the requests against the server at this URL (e.g., '
+             'http://localhost:8000) rather than through the test client')),
+    (('--accept',), dict(
+        dest='accept',
+        default='application/json',
+        help='The Accept header of the replayed requests (default: application/json)')),
+    (('--host',), dict(
+        dest='host',
+        help='The Host header of the requests replayed through the test client '
+             '(default: the first host in the ALLOWED_HOSTS setting)')),
+)
+
+
+class Command(BaseCommand):
+    help = """Generate signed requests, or replay them, to load test a resource.
+
+generate signs --count requests to --path, each with the given key=value
+pairs, a timestamp, and a sequence number (_n) that makes every signature
+unique, so that none of them are turned away by the replay cache. The
+requests are written one per line (method, path, and URL encoded data,
+separated by tabs) to --output, or to stdout, and can be signed by a pool
+of --processes processes. Signatures expire five minutes after their
+timestamp, so replay the requests before then (or pass --timestamp).
+
+replay sends the requests in a file generated with generate through
+django's test client (as if to --host), or to the server at --url, from
+--concurrency threads at a time, with an Accept header of --accept, and
+reports the throughput and the latency percentiles."""
+
+    args = "generate [key=value key=value ...] | replay file"
+
+    if hasattr(BaseCommand, 'option_list'):
+        # Django < 1.10
+        option_list = BaseCommand.option_list + tuple(make_option(*flags, **kwargs) for flags, kwargs in OPTIONS)
+
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*')
+        for flags, kwargs in OPTIONS:
+            parser.add_argument(*flags, **kwargs)
+
+    def handle(self, *args, **options):
+        if not args or args[0] not in ('generate', 'replay'):
+            raise CommandError('Expected "generate" or "replay"')
+        if args[0] == 'generate':
+            self.generate(args[1:], options)
+        else:
+            if len(args) != 2:
+                raise CommandError('Expected the file of requests to replay')
+            self.replay(args[1], options)
+
+    def generate(self, data, options):
+        secret_key = options.get('secret-key')
+        if not secret_key:
+            raise CommandError('--secret-key is required to sign the requests')
+
+        # Convert the data from a list of key, value pairs to a dict
+        data = dict(item.split('=', 1) for item in data)
+
+        timestamp = options.get('timestamp')
+        if timestamp is None:
+            dt = datetime.datetime.utcnow()
+            timestamp = calendar.timegm(dt.timetuple())
+
+        count = options['count']
+        chunks = [(secret_key, options['method'].upper(), options['path'], data, timestamp,
+                   start, min(start + CHUNK_SIZE, count))
+                  for start in range(0, count, CHUNK_SIZE)]
+
+        output = open(options['output'], 'w') if options.get('output') else self.stdout
+        pool = Pool(options['processes']) if options['processes'] > 1 else None
+        try:
+            # The chunks are written as soon as they're signed, in order
+            lines = pool.imap(sign_requests, chunks) if pool is not None else map(sign_requests, chunks)
+            for chunk in lines:
+                output.write(chunk)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if output is not self.stdout:
+                output.close()
+
+    def replay(self, filename, options):
+        with open(filename) as f:
+            requests = [line.rstrip('\n').split('\t') for line in f if line.strip()]
+        if not requests:
+            raise CommandError('There are no requests in %s' % filename)
+
+        url = options.get('url')
+        accept = options['accept']
+        if url:
+            send = send_http(url.rstrip('/'), accept)
+        else:
+            send = send_test_client(accept, options.get('host') or default_host())
+
+        concurrency = max(options['concurrency'], 1)
+        start = default_timer()
+        if concurrency > 1:
+            pool = ThreadPool(concurrency)
+            try:
+                results = pool.map(send, requests)
+            finally:
+                pool.terminate()
+        else:
+            results = [send(request) for request in requests]
+        elapsed = default_timer() - start
+
+        self.stdout.write(format_report(results, elapsed, concurrency))
+
+
+def sign_requests(chunk):
+    """
+    Signs the requests in a chunk and returns them, one per line
+    """
+    secret_key, method, path, data, timestamp, start, stop = chunk
+    lines = []
+    for n in range(start, stop):
+        params = dict(data, _n=str(n))
+        params['sig'] = calculate_signature(secret_key, params, timestamp)
+        params['t'] = timestamp
+        lines.append('%s\t%s\t%s\n' % (method, path, urlencode(sorted(params.items()))))
+    return ''.join(lines)
+
+
+def default_host():
+    """
+    Returns a host name that the ALLOWED_HOSTS setting lets requests use
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            # A leading dot allows the domain and all of its subdomains
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def send_test_client(accept, host):
+    """
+    Returns a function that sends a request, with the given Accept and Host
+    headers, through django's test client and returns its (status code,
+    latency) pair
+    """
+    # Test clients hold on to the cookies of the responses they receive, so
+    # every thread gets its own
+    local = threading.local()
+
+    def send(request):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(HTTP_HOST=host, SERVER_NAME=host)
+        method, path, data = request
+        start = default_timer()
+        if method == 'GET':
+            response = client.generic(method, '%s?%s' % (path, data), HTTP_ACCEPT=accept)
+        else:
+            response = client.generic(method, path, data, content_type='application/x-www-form-urlencoded',
+                                      HTTP_ACCEPT=accept)
+        return response.status_code, default_timer() - start
+    return send
+
+
+def send_http(url, accept):
+    """
+    Returns a function that sends a request, with the given Accept header, to
+    the server at the URL and returns its (status code, latency) pair. The
+    status code is 0 if the request couldn't be sent at all.
+    """
+    def send(request):
+        method, path, data = request
+        if method == 'GET':
+            http_request = Request('%s%s?%s' % (url, path, data))
+        else:
+            http_request = Request(url + path, data.encode('utf-8'))
+            http_request.add_header('Content-Type', 'application/x-www-form-urlencoded')
+        http_request.add_header('Accept', accept)
+        http_request.get_method = lambda: method
+
+        start = default_timer()
+        try:
+            response = urlopen(http_request)
+            response.read()
+            status = response.getcode()
+        except HTTPError as e:
+            status = e.code
+        except URLError:
+            status = 0
+        return status, default_timer() - start
+    return send
+
+
+def percentile(values, percent):
+    """
+    Returns the given percentile of a sorted list of values
+    """
+    index = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(index, 0)]
+
+
+def format_report(results, elapsed, concurrency):
+    latencies = sorted(latency for _, latency in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    lines = [
+        'requests:    %d (%d at a time)' % (len(results), concurrency),
+        'statuses:    %s' % ', '.join('%s: %d' % item for item in sorted(statuses.items())),
+        'failures:    %d' % sum(count for status, count in statuses.items() if not 200 <= status < 400),
+        'elapsed:     %.3f s' % elapsed,
+        'throughput:  %.1f requests/s' % (len(results) / elapsed),
+    ]
+    for percent in PERCENTILES:
+        lines.append('%-13s%.3f ms' % ('p%d:' % percent, percentile(latencies, percent) * 1000))
+    lines.append('max:         %.3f ms' % (latencies[-1] * 1000))
+    return '\n'.join(lines) + '\n'
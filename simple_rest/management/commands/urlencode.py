@@ -1,11 +1,24 @@
 from optparse import make_option
 import calendar, datetime
-import urllib
+try:
+    from urllib import urlencode
+except ImportError:
+    # Python 3
+    from urllib.parse import urlencode
 
 from django.core.management.base import BaseCommand
 from ...auth.signature import calculate_signature
 
 
+# The (flags, keyword arguments) of each of the command's options
+OPTIONS = (
+    (('--secret-key',), dict(
+        dest='secret-key',
+        action='store',
+        help='Calculate the secure signature with the secret key')),
+)
+
+
 class Command(BaseCommand):
     help = """URL encode the given data.
 
@@ -14,12 +27,14 @@ specified, the secure signature is also calculated and added to the result."""
 
     args = "secret_key [key=value key=value ...]"
 
-    option_list = BaseCommand.option_list + (
-        make_option('--secret-key',
-            dest='secret-key',
-            action='store',
-            help='Calculate the secure signature with the secret key'),
-        )
+    if hasattr(BaseCommand, 'option_list'):
+        # Django < 1.10
+        option_list = BaseCommand.option_list + tuple(make_option(*flags, **kwargs) for flags, kwargs in OPTIONS)
+
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*')
+        for flags, kwargs in OPTIONS:
+            parser.add_argument(*flags, **kwargs)
 
     def handle(self, *data, **options):
         # Convert the data from a list of key, value pairs to a dict
@@ -42,4 +57,4 @@ specified, the secure signature is also calculated and added to the result."""
             data['t'] = timestamp
             data['sig'] = signature
 
-        print urllib.urlencode(data)
+        self.stdout.write(urlencode(data) + '\n')
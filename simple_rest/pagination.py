@@ -0,0 +1,201 @@
+import base64
+import binascii
+import json
+
+import six
+from django.core.exceptions import FieldError, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .auth.signature import SIGNATURE_PARAMS
+from .exceptions import HttpError
+
+
+# The default number of objects on a page, and the largest number of objects
+# a client can ask for on a single page with the limit parameter
+PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+
+class PaginationMixin(object):
+    """
+    The settings and helpers shared by the pagination classes below
+
+    A pagination object is passed to the RESTfulResponse constructor (e.g.,
+    RESTfulResponse(pagination=KeysetPagination('-created'))), which then
+    hands every QuerySet returned by the resource to its paginate method
+    before it is rendered. The page is a dict holding the objects on the
+    page (as a QuerySet, so it can still be streamed or restricted to the
+    resource's fields) and links to the next and previous pages, if any.
+    To page through QuerySets some other way, mix this class into a class
+    that defines paginate(request, queryset) and builds its page with
+    get_page.
+
+    Clients can ask for up to max_per_page objects per page with the limit
+    query parameter. The total number of objects is only counted, and added
+    to the page as 'count', if count is True, since counting every row of a
+    large table is often more expensive than reading the page itself.
+    """
+    def __init__(self, per_page=PER_PAGE, max_per_page=MAX_PER_PAGE, count=False):
+        self.per_page = per_page
+        self.max_per_page = max_per_page
+        self.count = count
+
+    def get_limit(self, request):
+        limit = _int_param(request, 'limit', self.per_page)
+        if limit < 1:
+            raise HttpError('limit must be a positive integer', status=400)
+        return min(limit, self.max_per_page)
+
+    def get_page(self, request, queryset, objects, next_params, previous_params):
+        page = {
+            'objects': objects,
+            'next': _link(request, next_params) if next_params is not None else None,
+            'previous': _link(request, previous_params) if previous_params is not None else None,
+        }
+        if self.count:
+            page['count'] = queryset.count()
+        return page
+
+
+class OffsetPagination(PaginationMixin):
+    """
+    Pages through a QuerySet with the offset and limit query parameters
+
+    Whether or not there is a next page is found out by reading the primary
+    key of the first object past the page, rather than by counting the rows
+    of the QuerySet. Databases still have to read, and throw away, every row
+    before the offset though, so use KeysetPagination for large tables that
+    clients page deep into.
+    """
+    def paginate(self, request, queryset):
+        offset = _int_param(request, 'offset', 0)
+        if offset < 0:
+            raise HttpError('offset must not be negative', status=400)
+        limit = self.get_limit(request)
+        end = offset + limit
+        if not queryset.ordered:
+            # Without an ordering the same object could turn up on two pages
+            queryset = queryset.order_by('pk')
+
+        has_next = bool(list(queryset.values_list('pk', flat=True)[end:end + 1]))
+        next_params = {'offset': end, 'limit': limit} if has_next else None
+        previous_params = {'offset': max(offset - limit, 0), 'limit': limit} if offset else None
+        return self.get_page(request, queryset, queryset[offset:end], next_params, previous_params)
+
+
+class KeysetPagination(PaginationMixin):
+    """
+    Pages through a QuerySet, ordered by the given fields, with opaque cursors
+
+    Rather than skipping over an offset, each page is read from just past the
+    last object of the page before it (e.g., WHERE created > <last created>),
+    so every page is as cheap to read as the first, as long as the ordering
+    fields are indexed. The primary key is added to the ordering fields, if
+    it isn't one of them, so that no two objects share the same position.
+    The ordering fields must not be null.
+
+    The position of a page is passed in the cursor query parameter, which
+    clients should treat as opaque and only ever take from the next and
+    previous links.
+    """
+    def __init__(self, ordering='pk', per_page=PER_PAGE, max_per_page=MAX_PER_PAGE, count=False):
+        super(KeysetPagination, self).__init__(per_page, max_per_page, count)
+        if isinstance(ordering, six.string_types):
+            ordering = (ordering,)
+        self.ordering = tuple(ordering)
+        if not set(self.ordering) & set(['pk', '-pk']):
+            self.ordering += ('pk',)
+
+        # (name, descending) pairs
+        self._fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def paginate(self, request, queryset):
+        limit = self.get_limit(request)
+        cursor = request.GET.get('cursor')
+        queryset = queryset.order_by(*self.ordering)
+        field_names = [name for name, _ in self._fields]
+
+        objects = queryset
+        has_previous = False
+        if cursor:
+            direction, values = _decode_cursor(cursor, len(self._fields))
+            if direction == 'next':
+                objects = self._filter(queryset, values, after=True)
+                has_previous = True
+            else:
+                # Find the first object of the previous page by walking back
+                # from the cursor. If there aren't a whole page of objects
+                # before it, the previous page is the first page.
+                before = self._filter(queryset, values, after=False).reverse()
+                keys = list(before.values_list(*field_names)[:limit + 1])
+                if len(keys) > limit:
+                    objects = self._filter(queryset, keys[limit - 1], after=True, inclusive=True)
+                    has_previous = True
+
+        # Read the position of every object on the page, plus one more to find
+        # out whether or not there is a next page
+        keys = list(objects.values_list(*field_names)[:limit + 1])
+        next_params = previous_params = None
+        if len(keys) > limit:
+            next_params = {'cursor': _encode_cursor('next', keys[limit - 1]), 'limit': limit}
+        if has_previous and keys:
+            previous_params = {'cursor': _encode_cursor('previous', keys[0]), 'limit': limit}
+        return self.get_page(request, queryset, objects[:limit], next_params, previous_params)
+
+    def _filter(self, queryset, values, after=True, inclusive=False):
+        """
+        Returns the objects after (or before) the position given by values
+        """
+        condition = None
+        for i, (name, descending) in enumerate(self._fields):
+            lookup = 'gt' if after != descending else 'lt'
+            if inclusive and i == len(self._fields) - 1:
+                lookup += 'e'
+            clause = Q(**{'%s__%s' % (name, lookup): values[i]})
+            for (equal_name, _), value in zip(self._fields[:i], values[:i]):
+                clause &= Q(**{equal_name: value})
+            condition = clause if condition is None else condition | clause
+
+        try:
+            return queryset.filter(condition)
+        except (ValueError, TypeError, ValidationError, FieldError):
+            raise HttpError('Invalid cursor', status=400)
+
+
+def _int_param(request, name, default):
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise HttpError('%s must be an integer' % name, status=400)
+
+
+def _link(request, params):
+    query = request.GET.copy()
+    for name in SIGNATURE_PARAMS:
+        query.pop(name, None)
+    for name, value in params.items():
+        query[name] = value
+    return request.build_absolute_uri('%s?%s' % (request.path, query.urlencode()))
+
+
+def _encode_cursor(direction, values):
+    # Dates, times, and Decimal objects are encoded as strings that Django
+    # turns back into the right type when the cursor is used in a lookup
+    cursor = json.dumps([direction, list(values)], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, length):
+    try:
+        cursor = cursor.encode('ascii')
+        cursor = base64.urlsafe_b64decode(cursor + b'=' * (-len(cursor) % 4))
+        direction, values = json.loads(cursor.decode('utf-8'))
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise HttpError('Invalid cursor', status=400)
+    if direction not in ('next', 'previous') or not isinstance(values, list) or len(values) != length:
+        raise HttpError('Invalid cursor', status=400)
+    return direction, values
@@ -0,0 +1,183 @@
+import codecs
+import json
+import re
+
+from django.conf import settings
+
+from .exceptions import HttpError
+from .utils import serializers
+from .utils.serializers import from_json, from_msgpack, from_cbor
+
+
+# The default maximum size, in bytes, of a message body that is parsed in
+# memory. Can be changed with the SIMPLE_REST_MAX_BODY_SIZE setting (None
+# means there is no limit).
+MAX_BODY_SIZE = 2621440  # i.e., 2.5 MB
+
+# The number of bytes read from the request at a time when streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Matches the rest of a buffer that may still be part of a number
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')
+
+
+def parse_json(request):
+    """
+    Parses a JSON message body
+
+    The body is decoded with the configured JSON backend (see from_json). A
+    message body larger than the SIMPLE_REST_MAX_BODY_SIZE setting results in
+    a 413 (Request Entity Too Large) response and malformed JSON in a 400 (Bad
+    Request) response. An empty body is parsed as an empty dict.
+    """
+    body = read_body(request)
+    if not body.strip():
+        return {}
+
+    try:
+        return from_json(body)
+    except ValueError as e:
+        raise HttpError('Malformed JSON: %s' % e, status=400)
+
+
+def parse_msgpack(request):
+    """
+    Parses a MessagePack message body
+
+    Just like parse_json, but for MessagePack (requires the msgpack package).
+    """
+    body = read_body(request)
+    if not body:
+        return {}
+
+    try:
+        return from_msgpack(body)
+    except ValueError as e:
+        raise HttpError('Malformed MessagePack: %s' % e, status=400)
+
+
+def parse_cbor(request):
+    """
+    Parses a CBOR message body
+
+    Just like parse_json, but for CBOR (requires the cbor2 package).
+    """
+    body = read_body(request)
+    if not body:
+        return {}
+
+    try:
+        return from_cbor(body)
+    except (ValueError, EOFError) as e:
+        raise HttpError('Malformed CBOR: %s' % e, status=400)
+
+
+def stream_json(request):
+    """
+    Parses a message body made up of a JSON array one item at a time
+
+    Returns a generator that reads the body in chunks and yields each item of
+    the array as soon as it has been decoded, so the body as a whole is never
+    held in memory. Since the body is read as the generator is consumed, a
+    body that isn't a well formed JSON array only results in an HttpError
+    (400, Bad Request) once the malformed part is reached. That error can
+    only be turned into a 400 response if it's raised before the response
+    is sent; if the view hands the generator (or one built from it) to a
+    streaming RESTfulResponse, the 200 status has already gone out by then,
+    and the error just cuts the response short. No single item can be larger
+    than the SIMPLE_REST_MAX_BODY_SIZE setting.
+    """
+    return _iter_json_array(request, get_max_body_size())
+
+
+def get_max_body_size():
+    return getattr(settings, 'SIMPLE_REST_MAX_BODY_SIZE', MAX_BODY_SIZE)
+
+
+def read_body(request):
+    max_size = get_max_body_size()
+    if max_size is not None and _content_length(request) > max_size:
+        raise HttpError('Request body too large', status=413)
+
+    body = request.body
+    if max_size is not None and len(body) > max_size:
+        raise HttpError('Request body too large', status=413)
+    return body
+
+
+def _content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def _iter_json_array(stream, max_item_size=None, chunk_size=STREAM_CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, eof = u'', 0, False
+    started, expect_item, count = False, True, 0
+
+    while True:
+        # Skip the whitespace between tokens
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+
+        if pos == len(buf):
+            if eof:
+                raise HttpError('Malformed JSON: unterminated array', status=400)
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+            pos = 0
+            continue
+
+        char = buf[pos]
+        if not started:
+            if char != '[':
+                raise HttpError('Malformed JSON: expected an array', status=400)
+            started = True
+            pos += 1
+        elif char == ']' and (not expect_item or count == 0):
+            return
+        elif char == ',' and not expect_item:
+            expect_item = True
+            pos += 1
+        elif not expect_item:
+            raise HttpError('Malformed JSON: expected "," or "]"', status=400)
+        else:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                item, end = None, None
+
+            # A number may continue in the next chunk even if part of it
+            # decodes (e.g., "58446." decodes as 58446), so an item followed
+            # by nothing but characters that could belong to a number isn't
+            # trusted until more has been read
+            if end is None or (not eof and _NUMBER_TAIL.match(buf, end)):
+                if eof:
+                    raise HttpError('Malformed JSON in array item', status=400)
+                if max_item_size is not None and len(buf) - pos > max_item_size:
+                    raise HttpError('Request body item too large', status=413)
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+                pos = 0
+                continue
+
+            expect_item = False
+            count += 1
+            pos = end
+            yield item
+
+
+# Maps the mimetype of a message body to the function used to parse it. The
+# function takes the HttpRequest and returns the data in the message body.
+DEFAULT_PARSERS = {
+    'application/json': parse_json,
+}
+if serializers.msgpack is not None:
+    DEFAULT_PARSERS['application/msgpack'] = parse_msgpack
+if serializers.cbor2 is not None:
+    DEFAULT_PARSERS['application/cbor'] = parse_cbor
@@ -1,48 +1,183 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, QueryDict
+from django.utils.datastructures import MultiValueDict
 from django.views.generic import View
 from django.views.decorators.csrf import csrf_exempt
 
+from . import instrumentation
 from .exceptions import HttpError
+from .parsers import DEFAULT_PARSERS
+from .utils.decorators import asyncsupport
+
+
+class MessageBody(object):
+    """
+    The message body of a request for an HTTP method other than GET or POST
+
+    Installed under the name of the method (e.g., request.PUT) on a subclass
+    of the request's class that only the request itself is switched to (see
+    add_message_body), it returns the request's POST dict, so the message
+    body is only parsed when it's first accessed, and the handler gets the
+    parsed QueryDict (or whatever a parser returned) itself rather than a
+    proxy. No other request has the attribute.
+    """
+    def __init__(self, method):
+        self.method = method
+
+    def __get__(self, request, owner=None):
+        if request is None:
+            return self
+        if request.method != self.method:
+            raise AttributeError(self.method)
+        return request.POST
 
 
 class Resource(View):
+    """
+    A class-based view that handles every HTTP method
+
+    Form encoded and multipart message bodies are parsed by Django, while
+    message bodies of any mimetype in DEFAULT_PARSERS (e.g., JSON) are parsed
+    by the function the mimetype is mapped to. To parse other mimetypes, or
+    to override how one of the default mimetypes is parsed, map the mimetype
+    to a parser in the parsers attribute of the resource class. The parsed
+    message body is available as request.POST, request.PUT, etc., depending
+    on the method of the request.
+
+    On Python 3 with Django 4.1 or later, the handlers can also be defined
+    with async def, in which case the resource is served asynchronously
+    under ASGI. Either all of a resource's handlers are async or none are.
+    """
+    parsers = {}
 
     @csrf_exempt
     def dispatch(self, request, *args, **kwargs):
         # Technically, the HTTP spec does not preclude any HTTP request from
-        # containing data in the message body, so load the data into the POST
-        # dict if there is any present
+        # containing data in the message body, so make sure the data is
+        # loaded into the POST dict if there is any present. The message body
+        # isn't parsed until the POST (or FILES) dict is first accessed, so
+        # requests without a body, or views that never look at it, don't pay
+        # to parse it.
         method = request.method
-        request.method = 'POST'
-        request._load_post_and_files()
-
-        # Now that message body has been loaded, check for a method override
-        method_override = None
-        if request.GET and request.GET.get('_method', None):
-            request.GET._mutable = True
-            method_override = request.GET.pop('_method')[0].upper()
-            request.GET._mutable = False
-        elif request.POST and request.POST.get('_method', None):
-            request.POST._mutable = True
-            method_override = request.POST.pop('_method')[0].upper()
-            request.POST._mutable = False
+        parsers = DEFAULT_PARSERS
+        if self.parsers:
+            parsers = dict(DEFAULT_PARSERS, **self.parsers)
+        load_body_lazily(request, parsers)
+
+        # Check for a method override. The override is looked for in the
+        # message body only for POST requests (the only requests that a
+        # browser can send with a body), so no other request has its body
+        # parsed just to look for it.
+        method_override = pop_method_override(request.GET)
+        if method_override is None and method == 'POST':
+            method_override = pop_method_override(request.POST)
 
         # Set the HTTP method on the request according to the override first
         # if one exists, and if not, set it back to the original method used
         request.method = method_override or method
 
         # Add a dict to hold the message body data to the request based on the
-        # HTTP method used (or the method override if one was provided)
-        if request.method not in ['POST', 'GET']:
-            setattr(request, request.method, request.POST)
+        # HTTP method used (or the method override if one was provided). It's
+        # parsed when it's first accessed (see MessageBody).
+        if request.method not in ['POST', 'GET'] and request.method.lower() in self.http_method_names:
+            add_message_body(request)
 
         # Check for an HttpError when executing the view. If one was returned,
         # get the message and status code and return it, otherwise, let any
         # other type of exception bubble up or return the response if no error
         # occurred.
         try:
-            response = super(Resource, self).dispatch(request, *args, **kwargs)
+            with instrumentation.timer(request, 'dispatch'):
+                response = super(Resource, self).dispatch(request, *args, **kwargs)
         except HttpError as e:
             response = HttpResponse(status=e.status)
 
-        return response
+        # Async handlers return a coroutine, which is awaited, and the
+        # response finished off, once Django hands it to the event loop
+        if asyncsupport is not None and self.view_is_async:
+            return asyncsupport.finish_dispatch(request, response)
+        return instrumentation.finish(request, response)
+
+
+def pop_method_override(params):
+    """
+    Removes the _method parameter from the given parameters and returns it
+    """
+    if not hasattr(params, 'get') or not params.get('_method', None):
+        return None
+    if isinstance(params, QueryDict):
+        params._mutable = True
+        method_override = params.pop('_method')[0]
+        params._mutable = False
+    else:
+        method_override = params.pop('_method')
+    return method_override.upper()
+
+
+# The subclasses of the request classes that add_message_body switches
+# requests to, keyed by the original class and the HTTP method
+_message_body_classes = {}
+
+
+def add_message_body(request):
+    """
+    Adds the message body to the request under the name of its HTTP method
+    (e.g., request.PUT)
+
+    The request's own class is left alone, so other requests, including
+    those handled by views other than resources, aren't affected.
+    """
+    request_class, method = type(request), request.method
+    if getattr(request_class, method, None) is not None:
+        return
+    key = (request_class, method)
+    message_body_class = _message_body_classes.get(key)
+    if message_body_class is None:
+        message_body_class = type(request_class.__name__, (request_class,), {method: MessageBody(method)})
+        message_body_class = _message_body_classes.setdefault(key, message_body_class)
+    request.__class__ = message_body_class
+
+
+def load_body_lazily(request, parsers=None):
+    """
+    Makes the request load its message body into the POST and FILES dicts,
+    when they're first accessed, whatever the HTTP method of the request.
+
+    If the mimetype of the message body is in the given parsers dict, the
+    function it maps to is called with the request and whatever it returns
+    is loaded into the POST dict in place of the form data.
+    """
+    request_class = type(request)
+
+    def load_post_and_files():
+        with instrumentation.timer(request, 'body'):
+            _load_post_and_files()
+
+    def _load_post_and_files():
+        content_type = request.META.get('CONTENT_TYPE', '').split(';')[0].strip().lower()
+        parser = parsers and parsers.get(content_type)
+        if parser is not None:
+            try:
+                request._post, request._files = parser(request), MultiValueDict()
+            except Exception:
+                # Just like Django does, make sure a message body that can't
+                # be parsed isn't parsed again while the error is reported
+                request._mark_post_parse_error()
+                raise
+            return
+
+        # Django only parses the message body of POST requests
+        method = request.method
+        request.method = 'POST'
+        try:
+            request_class._load_post_and_files(request)
+        finally:
+            request.method = method
+
+    # Forget about any (empty) message body that was loaded before the
+    # request reached the resource, since it was loaded as if the request
+    # had no body
+    if request.method != 'POST':
+        request.__dict__.pop('_post', None)
+        request.__dict__.pop('_files', None)
+
+    request._load_post_and_files = load_post_and_files
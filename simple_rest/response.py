@@ -1,15 +1,38 @@
-import collections
+import hashlib
 import mimetypes
+import types
+try:
+    from collections.abc import Callable, MutableMapping, Sequence
+except ImportError:
+    # Python 2
+    from collections import Callable, MutableMapping, Sequence
 
 import mimeparse
 
 from django.conf import settings
-from django.shortcuts import render_to_response
-from django.http import HttpResponse
+from django.db.models.query import QuerySet
+try:
+    from django.shortcuts import render_to_response
+except ImportError:
+    # Django >= 3.0
+    from django.shortcuts import render
+    render_to_response = lambda template_name, context: render(None, template_name, context)
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import quote_etag
+try:
+    from django.http import StreamingHttpResponse
+except ImportError:
+    # Django < 1.5 will happily stream an iterator passed to HttpResponse
+    StreamingHttpResponse = HttpResponse
 
-from .utils.decorators import wrap_object
+from . import instrumentation
+from .conditional import not_modified
+from .utils.cache import LRUCache
+from .utils.compression import COMPRESS_MIN_SIZE, compress_response
+from .utils.decorators import asyncsupport, stage_decorator, wrap_object
 from .exceptions import HttpError
-from .utils.serializers import to_json, to_html, to_text
+from .utils import serializers
+from .utils.serializers import to_json, to_json_stream, to_html, to_text, to_msgpack, to_cbor
 
 
 DEFAULT_MIMETYPES = {
@@ -18,8 +41,38 @@ DEFAULT_MIMETYPES = {
     'text/plain': to_text
 }
 
+# Binary formats are only supported if the library that encodes them is
+# installed, and are never picked for a wildcard in the Accept header (e.g.,
+# application/*) over the formats above
+BINARY_MIMETYPES = {}
+if serializers.msgpack is not None:
+    BINARY_MIMETYPES['application/msgpack'] = to_msgpack
+if serializers.cbor2 is not None:
+    BINARY_MIMETYPES['application/cbor'] = to_cbor
+DEFAULT_MIMETYPES.update(BINARY_MIMETYPES)
 
-class RESTfulResponse(collections.MutableMapping, collections.Callable):
+# The mimetypes picked when the Accept header matches more than one equally
+# well (e.g., */* or text/*), from the least to the most preferred. Browsers
+# and curl send */*, so they get HTML.
+PREFERRED_MIMETYPES = ('application/json', 'text/plain', 'text/html')
+
+# Let the binary formats be requested with the _format override as well
+mimetypes.add_type('application/msgpack', '.msgpack')
+mimetypes.add_type('application/cbor', '.cbor')
+
+# Renderers used in place of the defaults above when streaming is turned on
+# and the data returned by a view is a QuerySet or a generator. Generators
+# rendered in any other mimetype are read into a list first.
+STREAMING_MIMETYPES = {
+    'application/json': to_json_stream
+}
+
+# The maximum number of (Accept header, format) pairs for which the result of
+# content negotiation is remembered by each RESTfulResponse instance
+NEGOTIATION_CACHE_SIZE = 256
+
+
+class RESTfulResponse(MutableMapping, Callable):
     """
     Can be used as a decorator or an instance to properly formatted content
 
@@ -35,15 +88,73 @@ class RESTfulResponse(collections.MutableMapping, collections.Callable):
     not found amongst the supported mimetypes, the content-type of the response
     will default to 'application/json'.
 
+    Responses can also be streamed to the client, rather than built in memory
+    all at once, by passing streaming=True to the constructor. When streaming
+    is turned on, any view that returns a QuerySet or a generator will have
+    its data encoded incrementally and returned in a StreamingHttpResponse.
+    Alternatively, any renderer in the mimetype mapping with a true
+    'streaming' attribute (e.g., to_json_stream) is always streamed.
+
+    The fields of a resource that are exposed to the client can be declared
+    by passing a sequence of field names as the fields argument. QuerySets
+    returned by the view are then restricted to those fields (with only())
+    before they are rendered, so only the declared columns are ever read from
+    the database. Clients can narrow them down further with a comma separated
+    list of field names in the fields query parameter (e.g., ?fields=id,name).
+
+    Similarly, the relations a client may ask to have included in a response,
+    with the include query parameter (e.g., ?include=author), are declared
+    with the include argument. Only foreign keys can be included, and they
+    are followed with select_related(), so the related objects are read in
+    the same query. Asking for a field or relation that hasn't been declared,
+    or for a relation that isn't a foreign key, results in a 400 (Bad
+    Request) response.
+
+    Passing etag=True adds a strong ETag, calculated from the rendered body,
+    to every successful (non-streaming) GET response and answers requests
+    whose If-None-Match header matches it with a 304 (Not Modified). Use the
+    simple_rest.conditional.condition decorator instead if the ETag or last
+    modified time of a resource can be determined without running its view.
+
+    QuerySets can also be split into pages by passing one of the pagination
+    classes in simple_rest.pagination (e.g., KeysetPagination) as the
+    pagination argument. Every QuerySet returned by the view is then replaced
+    by the page the request asked for, along with links to the pages next to
+    it, before it is rendered.
+
+    Passing compress=True compresses every response body of at least
+    compress_min_size bytes with the best content coding (e.g., gzip) the
+    request's Accept-Encoding header allows. Streamed responses are
+    compressed a chunk at a time as they're sent.
+
+    Views defined with async def are awaited, and their results rendered in
+    a worker thread (see simple_rest.asyncsupport). Where async views are
+    supported, arender_to_response is the awaitable version of
+    render_to_response.
+
     This class is inspired by an excellent blog post from James Bennett. See
     http://www.b-list.org/weblog/2008/nov/29/multiresponse/ for more
     information.
     """
-    def __init__(self, mimetype_mapping=None):
+    def __init__(self, mimetype_mapping=None, streaming=False, fields=None, etag=False,
+                 compress=False, compress_min_size=COMPRESS_MIN_SIZE, pagination=None, include=None):
+        self.streaming = streaming
+        self.fields = fields
+        self.include = include
+        self.pagination = pagination
+        self.etag = etag
+        self.compress = compress
+        self.compress_min_size = compress_min_size
         self._mimetypes = {}
         if mimetype_mapping:
             self._mimetypes.update(mimetype_mapping)
 
+        # Content negotiation only depends on the supported mimetypes and the
+        # Accept header and format requested, so the supported mimetypes and
+        # the result of each negotiation are cached until the mapping changes
+        self._keys = None
+        self._negotiated = LRUCache(NEGOTIATION_CACHE_SIZE)
+
     def __len__(self):
         return len(self.keys())
 
@@ -59,67 +170,227 @@ class RESTfulResponse(collections.MutableMapping, collections.Callable):
 
     def __setitem__(self, mimetype, func_or_templ):
         self._mimetypes[mimetype] = func_or_templ
+        self._clear_negotiation_cache()
 
     def __delitem__(self, mimetype):
         del self._mimetypes[mimetype]
+        self._clear_negotiation_cache()
 
     def keys(self):
-        return list(set(self._mimetypes.keys()) | set(DEFAULT_MIMETYPES.keys()))
+        if self._keys is None:
+            # mimeparse breaks ties in favour of the mimetype listed last, so
+            # the binary formats go first and the preferred mimetypes last,
+            # in the order of PREFERRED_MIMETYPES
+            self._keys = sorted(set(self._mimetypes.keys()) | set(DEFAULT_MIMETYPES.keys()),
+                                key=_mimetype_order)
+        return self._keys
+
+    def _clear_negotiation_cache(self):
+        self._keys = None
+        self._negotiated.clear()
+
+    def negotiate(self, request, format=None):
+        """
+        Returns the mimetype, and the template or function that renders it,
+        that best matches the format requested or the request's Accept header.
+        """
+        format = get_format_override(request) or format
+        accept = request.META.get('HTTP_ACCEPT', '')
+        cache_key = (accept, format)
+
+        negotiated = self._negotiated.get(cache_key)
+        if negotiated is None:
+            mimetype = mimeparse.best_match(self.keys(), accept)
+            mimetype = mimetypes.guess_type('placeholder_filename.%s' % format)[0] or mimetype
+            negotiated = (mimetype, self.get(mimetype))
+            self._negotiated.set(cache_key, negotiated)
+        return negotiated
+
+    def select_fields(self, request, queryset):
+        """
+        Restricts the QuerySet to the fields, and related objects, that the
+        resource exposes and the request asks for
+        """
+        model = queryset.model
+        fields = self.fields
+        requested_fields = get_list_param(request, 'fields')
+        if requested_fields:
+            allowed = fields
+            if allowed is None:
+                allowed = [field.name for field in model._meta.fields]
+            unknown = [name for name in requested_fields if name not in allowed]
+            if unknown:
+                raise HttpError('Unknown fields: %s' % ', '.join(unknown), status=400)
+            fields = requested_fields
+
+        include = get_list_param(request, 'include')
+        unknown = [name for name in include if name not in (self.include or ())]
+        if unknown:
+            raise HttpError('Unknown relations: %s' % ', '.join(unknown), status=400)
+        # Rows are rendered with values(), which can only read the fields of
+        # the objects that foreign keys point to
+        not_foreign_keys = [name for name in include if not _is_foreign_key(model, name)]
+        if not_foreign_keys:
+            raise HttpError('Only foreign keys can be included: %s' % ', '.join(not_foreign_keys), status=400)
+
+        # The view picked the columns of a values() or values_list() QuerySet
+        # itself, and neither only() nor select_related() can be called on one
+        if serializers.is_values_queryset(queryset):
+            return queryset
+
+        if fields is not None:
+            # A related object can't be read in the same query as the model
+            # without the foreign key that points to it
+            queryset = queryset.only(*(list(fields) + [name for name in include if name not in fields]))
+        if include:
+            queryset = queryset.select_related(*include)
+        return queryset
 
     def __call__(self, view_obj):
-        def decorator(view_func):
-            def wrapper(request, *args, **kwargs):
-                try:
-                    results = view_func(request, *args, **kwargs)
-                except HttpError, e:
-                    results = (
-                        e.message and {'error': e.message} or None,
-                        e.status
-                    )
-
-                # TODO: What should be done about a resource that returns a normal
-                #       Django HttpResponse? Right now, if an HttpResponse is
-                #       returned, it is allowed to propogate. In other words, it
-                #       acts just as it would if content negotiation wasn't being
-                #       used. Another option would be to extract the content and
-                #       status code from the HttpResponse object and pass those
-                #       into the render_to_response method.
-                if isinstance(results, HttpResponse):
-                    return results
-
-                # Get the status code, if one was provided
-                if isinstance(results, collections.Sequence) and len(results) == 2:
-                    try:
-                        data, status_code = results[0], int(results[1])
-                    except Exception:
-                        data, status_code = results, 200
-                else:
-                    data, status_code = results, 200
-
-                response = self.render_to_response(request, data, status_code, kwargs.get('_format', None))
-                return response
-            return wrapper
+        decorator = stage_decorator(
+            before=lambda request, *args, **kwargs: (kwargs.get('_format', None), None),
+            after=lambda request, format, results: self.respond(request, results, format),
+            catch=_error_results)
         return wrap_object(view_obj, decorator)
 
+    def respond(self, request, results, format=None):
+        """
+        Turns whatever a view returned into a response
+        """
+        # TODO: What should be done about a resource that returns a normal
+        #       Django HttpResponse? Right now, if an HttpResponse is
+        #       returned, it is allowed to propogate. In other words, it
+        #       acts just as it would if content negotiation wasn't being
+        #       used. Another option would be to extract the content and
+        #       status code from the HttpResponse object and pass those
+        #       into the render_to_response method.
+        if isinstance(results, HttpResponse):
+            return results
+
+        # Get the status code, if one was provided
+        if isinstance(results, Sequence) and len(results) == 2:
+            try:
+                data, status_code = results[0], int(results[1])
+            except Exception:
+                data, status_code = results, 200
+        else:
+            data, status_code = results, 200
+
+        # An HttpError raised while the response is rendered (e.g., by a
+        # generator reading a malformed message body) is rendered just like
+        # one raised by the view
+        try:
+            return self.render_to_response(request, data, status_code, format)
+        except HttpError as e:
+            data, status_code = _error_results(e)
+        return self.render_to_response(request, data, status_code, format)
+
     def render_to_response(self, request, data=None, status=200, format=None):
-        format = request.REQUEST.get('_format', None) or format
-        mimetype = mimeparse.best_match(self.keys(), request.META.get('HTTP_ACCEPT', ''))
-        mimetype = mimetypes.guess_type('placeholder_filename.%s' % format)[0] or mimetype
+        with instrumentation.timer(request, 'negotiate'):
+            mimetype, templ_or_func = self.negotiate(request, format)
         content_type = '%s; charset=%s' % (mimetype, settings.DEFAULT_CHARSET)
 
-        templ_or_func = self.get(mimetype)
-
         # If a template or function isn't found, return a 415 (unsupportted media type) response
         if not templ_or_func:
             return HttpResponse(status=415)
 
-        if data is None:
-            response = HttpResponse()
-        elif isinstance(templ_or_func, str):
-            response = render_to_response(templ_or_func, {'context': data})
-        else:
-            response = HttpResponse(templ_or_func(data))
+        # Only read the fields (and related objects) asked for from the
+        # database, and only render the page of the QuerySet asked for
+        if isinstance(data, QuerySet):
+            try:
+                data = self.select_fields(request, data)
+                if self.pagination is not None:
+                    data = self.pagination.paginate(request, data)
+            except HttpError as e:
+                data, status = _error_results(e)
+
+        # Swap in the streaming version of the default renderer if streaming
+        # has been turned on and the data can be consumed incrementally
+        if (self.streaming and mimetype not in self._mimetypes and
+                isinstance(data, (QuerySet, types.GeneratorType))):
+            templ_or_func = STREAMING_MIMETYPES.get(mimetype, templ_or_func)
+
+        # Any other renderer needs a generator read into a list first
+        if isinstance(data, types.GeneratorType) and not getattr(templ_or_func, 'streaming', False):
+            data = list(data)
+
+        # Streamed responses are rendered as they're sent, so only the time
+        # taken to set them up is recorded
+        with instrumentation.timer(request, 'render'):
+            if data is None:
+                response = HttpResponse()
+            elif isinstance(templ_or_func, str):
+                response = render_to_response(templ_or_func, {'context': data})
+            elif getattr(templ_or_func, 'streaming', False):
+                response = StreamingHttpResponse(templ_or_func(data))
+            else:
+                response = HttpResponse(templ_or_func(data))
+        if not getattr(response, 'streaming', False):
+            instrumentation.incr('bytes_rendered', len(response.content), request)
 
         response['Content-Type'] = content_type
         response.status_code = status
+
+        if (self.etag and status == 200 and request.method in ('GET', 'HEAD') and
+                not getattr(response, 'streaming', False)):
+            etag = hashlib.md5(response.content).hexdigest()
+            if not_modified(request, etag):
+                response = HttpResponseNotModified()
+            response['ETag'] = quote_etag(etag)
+
+        if self.compress:
+            with instrumentation.timer(request, 'compress'):
+                response = compress_response(request, response, self.compress_min_size)
+
         return response
+
+
+if asyncsupport is not None:
+    RESTfulResponse.arender_to_response = asyncsupport.arender_to_response
+
+
+def _error_results(e):
+    """
+    Returns the results rendered in place of an HttpError
+    """
+    return e.message and {'error': e.message} or None, e.status
+
+
+def _mimetype_order(mimetype):
+    if mimetype in BINARY_MIMETYPES:
+        return (0, 0, mimetype)
+    if mimetype in PREFERRED_MIMETYPES:
+        return (2, PREFERRED_MIMETYPES.index(mimetype), mimetype)
+    return (1, 0, mimetype)
+
+
+def _is_foreign_key(model, name):
+    # The model's fields are its concrete, forward fields, so they don't
+    # include many-to-many or reverse relations
+    for field in model._meta.fields:
+        if field.name == name:
+            return serializers.get_related_model(field) is not None
+    return False
+
+
+def get_list_param(request, name):
+    """
+    Returns the comma separated values of the given querystring parameter
+    """
+    return [value.strip() for value in request.GET.get(name, '').split(',') if value.strip()]
+
+
+def get_format_override(request):
+    """
+    Returns the _format parameter from the message body or the querystring
+
+    The message body takes precedence over the querystring, but is only
+    looked at if it has already been parsed (e.g., by the view, or by
+    Resource to look for a method override in a POST) into a dict, so that
+    content negotiation never parses a message body the view didn't need.
+    """
+    if '_post' in request.__dict__:
+        message_body = request.POST
+        if hasattr(message_body, 'get') and message_body.get('_format', None):
+            return message_body.get('_format')
+    return request.GET.get('_format', None)
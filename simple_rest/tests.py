@@ -0,0 +1,87 @@
+import json
+import random
+import unittest
+from io import BytesIO
+
+from django.http import HttpResponseForbidden
+from django.test.client import RequestFactory
+from django.utils.decorators import method_decorator
+
+from .conditional import condition, not_modified
+from .exceptions import HttpError
+from .parsers import _iter_json_array
+from .resource import Resource
+from .response import RESTfulResponse
+
+
+class StreamJSONTest(unittest.TestCase):
+
+    def parse(self, body, chunk_size):
+        return list(_iter_json_array(BytesIO(body.encode('utf-8')), chunk_size=chunk_size))
+
+    def test_chunk_boundaries(self):
+        # Every item must decode to the same value however the body is split
+        # into chunks, including numbers split at a ".", "e", or "-"
+        rand = random.Random(0)
+        items = [58446.5, -12, 1e-7, -3.25e+10, 0, 123456789, u'caf\xe9', True, None,
+                 {'a': [1.5, -2]}, [], u'\u2603']
+        items += [rand.uniform(-1e6, 1e6) for i in range(50)]
+        for separator in (',', ', ', ' ,\n'):
+            body = '[%s]' % separator.join(json.dumps(item) for item in items)
+            for chunk_size in (1, 2, 3, 7, 64):
+                self.assertEqual(self.parse(body, chunk_size), json.loads(body))
+
+    def test_number_at_end_of_body(self):
+        self.assertEqual(self.parse('[1, 2.5e3]', 1), [1, 2500.0])
+
+    def test_malformed(self):
+        for body in ('[1 2]', '[1,', '{"a": 1}', '[1.]', '[-]'):
+            with self.assertRaises(HttpError):
+                self.parse(body, 2)
+
+
+class NotModifiedTest(unittest.TestCase):
+
+    def request(self, if_none_match):
+        return RequestFactory().get('/', HTTP_IF_NONE_MATCH=if_none_match, HTTP_ACCEPT='application/json')
+
+    def test_if_none_match(self):
+        for header in ('"abc"', 'W/"abc"', '"xyz", "abc"', '*'):
+            self.assertTrue(not_modified(self.request(header), 'abc'), header)
+        for header in ('"xyz"', '"abcd"', 'W/"xyz"'):
+            self.assertFalse(not_modified(self.request(header), 'abc'), header)
+
+    def test_etag_round_trip(self):
+        @RESTfulResponse(etag=True)
+        class Contacts(Resource):
+            def get(self, request):
+                return {'name': 'Ann'}
+        view = Contacts.as_view()
+
+        response = view(RequestFactory().get('/', HTTP_ACCEPT='application/json'))
+        self.assertEqual(response.status_code, 200)
+        response = view(self.request(response['ETag']))
+        self.assertEqual(response.status_code, 304)
+
+
+def deny(view_func):
+    def wrapper(request, *args, **kwargs):
+        return HttpResponseForbidden()
+    return wrapper
+
+
+class PipelineTest(unittest.TestCase):
+
+    def test_outer_decorator_is_kept(self):
+        # method_decorator copies the pipeline of the method it wraps onto
+        # its own wrapper, which must not make a later decorator rebuild the
+        # pipeline from the inner method and drop the outer decorator
+        @condition(etag_func=lambda request, *args, **kwargs: 'abc')
+        class Secret(Resource):
+            @method_decorator(deny)
+            @RESTfulResponse()
+            def get(self, request):
+                return {'secret': 1}
+
+        response = Secret.as_view()(RequestFactory().get('/', HTTP_ACCEPT='application/json'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,74 @@
+import threading
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+
+class LRUCache(object):
+    """
+    A thread-safe, size bounded, least recently used cache
+
+    Once the cache holds maxsize entries, adding a new entry evicts the entry
+    that was least recently read or written. If a timeout (in seconds) is
+    given, entries also expire that many seconds after they were written.
+    """
+    def __init__(self, maxsize=128, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.time():
+                return default
+            # Re-insert the entry to mark it as the most recently used
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._set(key, value)
+
+    def add(self, key, value):
+        """
+        Sets the value of the key only if it is not already in the cache
+
+        Returns True if the value was set and False otherwise.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                return False
+            self._set(key, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _set(self, key, value):
+        expires = None
+        if self.timeout is not None:
+            expires = time.time() + self.timeout
+        self._data.pop(key, None)
+        self._data[key] = (value, expires)
+        while len(self._data) > self.maxsize:
+            del self._data[next(iter(self._data))]
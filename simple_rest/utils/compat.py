@@ -0,0 +1,13 @@
+"""
+Helpers whose names or homes differ between the versions of Django that are
+supported
+"""
+try:
+    from django.utils.encoding import force_bytes, force_text
+except ImportError:
+    try:
+        # Django >= 4.0
+        from django.utils.encoding import force_bytes, force_str as force_text
+    except ImportError:
+        # Django < 1.5
+        from django.utils.encoding import smart_str as force_bytes, force_unicode as force_text
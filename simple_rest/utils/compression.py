@@ -0,0 +1,164 @@
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .cache import LRUCache
+
+
+# The default size, in bytes, of the smallest body that is worth compressing
+COMPRESS_MIN_SIZE = 1024
+
+# The maximum number of Accept-Encoding headers whose negotiated encoding is
+# remembered
+NEGOTIATION_CACHE_SIZE = 256
+
+
+class _ZlibCompressor(object):
+    def __init__(self, wbits):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor(object):
+    def __init__(self):
+        self._compressor = brotli.Compressor()
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _gzip():
+    # A window size of 16 + MAX_WBITS makes zlib write a gzip header
+    return _ZlibCompressor(16 + zlib.MAX_WBITS)
+
+
+def _deflate():
+    # HTTP's "deflate" is the zlib format, not a raw deflate stream
+    return _ZlibCompressor(zlib.MAX_WBITS)
+
+
+# Maps each supported content coding to a function that returns a new
+# compressor (an object with compress and flush methods), in order of the
+# server's preference
+ENCODINGS = []
+if brotli is not None:
+    ENCODINGS.append(('br', _BrotliCompressor))
+if zstandard is not None:
+    ENCODINGS.append(('zstd', lambda: zstandard.ZstdCompressor().compressobj()))
+ENCODINGS.extend([
+    ('gzip', _gzip),
+    ('deflate', _deflate),
+])
+_compressors = dict(ENCODINGS)
+
+_negotiated = LRUCache(NEGOTIATION_CACHE_SIZE)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Returns the supported content coding that best matches the given
+    Accept-Encoding header, or None if the body should not be compressed.
+
+    The coding with the highest quality value wins and ties are broken by the
+    order of ENCODINGS.
+    """
+    if not accept_encoding:
+        return None
+
+    encoding = _negotiated.get(accept_encoding, False)
+    if encoding is False:
+        qualities = {}
+        for coding in accept_encoding.split(','):
+            params = coding.strip().split(';')
+            quality = 1.0
+            for param in params[1:]:
+                name, _, value = param.strip().partition('=')
+                if name.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[params[0].strip().lower()] = quality
+
+        encoding, best = None, 0.0
+        for name, _ in ENCODINGS:
+            quality = qualities.get(name, qualities.get('*', 0.0))
+            if quality > best:
+                encoding, best = name, quality
+        _negotiated.set(accept_encoding, encoding)
+    return encoding
+
+
+def compress(encoding, data):
+    """
+    Compresses the given bytes with the given content coding
+    """
+    compressor = _compressors[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(encoding, chunks):
+    """
+    Compresses an iterable of chunks of bytes, chunk by chunk
+    """
+    compressor = _compressors[encoding]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(request, response, min_size=COMPRESS_MIN_SIZE):
+    """
+    Compresses the body of the response, in place, with the content coding
+    negotiated from the request's Accept-Encoding header.
+
+    Bodies smaller than min_size bytes, or that don't get any smaller when
+    compressed, are left as is. Streaming responses are always compressed, a
+    chunk at a time. A strong ETag on the response is made weak, since the
+    compressed body isn't byte for byte the same as the original.
+    """
+    if response.status_code in (204, 304) or response.has_header('Content-Encoding'):
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if getattr(response, 'streaming', False):
+        response.streaming_content = compress_stream(encoding, response.streaming_content)
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+    else:
+        if len(response.content) < min_size:
+            return response
+        compressed = compress(encoding, response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        response['ETag'] = 'W/' + response['ETag']
+    response['Content-Encoding'] = encoding
+    return response
@@ -1,7 +1,122 @@
 import inspect
-from functools import update_wrapper
+import sys
+import types
+from functools import update_wrapper, WRAPPER_ASSIGNMENTS
 
-from django.utils.decorators import method_decorator, available_attrs
+try:
+    from django.utils.decorators import available_attrs
+except ImportError:
+    # Django >= 3.0
+    available_attrs = lambda fn: WRAPPER_ASSIGNMENTS
+
+from django.views.generic import View
+
+from .. import instrumentation
+from ..exceptions import HttpError
+
+# Support for async handlers, or None where it isn't available (i.e., on
+# Python 2 or with Django < 4.1)
+asyncsupport = None
+if sys.version_info >= (3, 6):
+    try:
+        from .. import asyncsupport
+    except ImportError:
+        pass
+
+
+class Stage(object):
+    """
+    A single step in the pipeline a request goes through on its way to a
+    resource method and back
+
+    before is called with the arguments of the view and returns a (state,
+    response) pair. If the response isn't None, it's returned right away and
+    none of the stages below this one, nor the view, are run. after is called
+    with the request, the state returned by before (or None), and whatever
+    the stages below returned, and returns what this stage returns. catch is
+    called with any HttpError raised below the stage and returns a result
+    that is passed on to after in place of the error. Any of the three can be
+    None.
+
+    A stage can also be made from a decorator that only knows how to wrap a
+    view function, in which case the rest of the pipeline is wrapped with it
+    for every request.
+    """
+    __slots__ = ('before', 'after', 'catch', 'decorator')
+
+    def __init__(self, before=None, after=None, catch=None, decorator=None):
+        self.before = before
+        self.after = after
+        self.catch = catch
+        self.decorator = decorator
+
+
+def stage_decorator(before=None, after=None, catch=None):
+    """
+    Returns a decorator for view functions that runs the given stage
+
+    The stage is kept in the decorator's stage attribute, so that wrap_object
+    can add it to a resource method's pipeline rather than wrap the method.
+    """
+    stage = Stage(before, after, catch)
+
+    def decorator(view_func):
+        def wrapper(request, *args, **kwargs):
+            return run_pipeline((stage,), view_func, request, args, kwargs)
+        return wrapper
+    decorator.stage = stage
+    return decorator
+
+
+def run_pipeline(stages, view, request, args, kwargs):
+    """
+    Runs a request through the stages, from the outermost to the innermost,
+    and then the view
+    """
+    entered = []
+    error = None
+    try:
+        for index, stage in enumerate(stages):
+            if stage.decorator is not None:
+                inner = stages[index + 1:]
+                def inner_view(request, *args, **kwargs):
+                    return run_pipeline(inner, view, request, args, kwargs)
+                result = stage.decorator(inner_view)(request, *args, **kwargs)
+                break
+
+            state = None
+            if stage.before is not None:
+                state, response = stage.before(request, *args, **kwargs)
+                if response is not None:
+                    result = response
+                    break
+            entered.append((stage, state))
+        else:
+            if instrumentation.is_enabled():
+                with instrumentation.timer(request, 'view'):
+                    result = view(request, *args, **kwargs)
+            else:
+                result = view(request, *args, **kwargs)
+    except HttpError as e:
+        error = e
+
+    # Unwind the stages that were entered. Just as with nested decorators,
+    # an error skips the stages between where it was raised and the first
+    # stage that catches it.
+    while entered:
+        stage, state = entered.pop()
+        try:
+            if error is not None:
+                if stage.catch is None:
+                    continue
+                result, error = stage.catch(error), None
+            if stage.after is not None:
+                result = stage.after(request, state, result)
+        except HttpError as e:
+            error = e
+    if error is not None:
+        raise error
+    return result
 
 
 def wrap_object(obj, decorator):
@@ -12,21 +127,54 @@ def wrap_object(obj, decorator):
     and returned. If obj is a class (i.e., a class based view), the methods
     in the class corresponding to HTTP methods will be decorated and the
     resultant class object will be returned.
+
+    Rather than wrapping a method once more for every decorator applied to
+    it, the decorators' stages (see Stage) are collected in a pipeline that
+    is run by a single wrapper around the original method. Decorators without
+    a stage attribute are added to the pipeline as is. Methods defined with
+    async def are run by an async version of the pipeline and stay coroutine
+    functions (see simple_rest.asyncsupport).
     """
-    actual_decorator = method_decorator(decorator)
+    stage = getattr(decorator, 'stage', None) or Stage(decorator=decorator)
+
+    def decorate(method):
+        method = getattr(method, '__func__', method)
+        # The pipeline is only picked up from a method that is the wrapper
+        # compile_pipeline made. Any other decorator (e.g., method_decorator)
+        # copies the attribute onto its own wrapper, which has to stay in the
+        # pipeline as the method.
+        pipeline = getattr(method, '_simple_rest_pipeline', None)
+        stages = ()
+        if pipeline is not None and pipeline[0] is method:
+            method, stages = pipeline[1:]
+        return compile_pipeline(method, (stage,) + stages)
 
     if inspect.isfunction(obj):
-        wrapped_obj = actual_decorator(obj)
-        update_wrapper(wrapped_obj, obj, assigned=available_attrs(obj))
+        wrapped_obj = decorate(obj)
     elif inspect.isclass(obj):
         for method_name in obj.http_method_names:
             if hasattr(obj, method_name):
-                method = getattr(obj, method_name)
-                wrapped_method = actual_decorator(method)
-                update_wrapper(wrapped_method, method, assigned=available_attrs(method))
-                setattr(obj, method_name, wrapped_method)
+                setattr(obj, method_name, decorate(getattr(obj, method_name)))
         wrapped_obj = obj
     else:
         raise TypeError("received an object of type '{0}' expected 'function' or 'classobj'.".format(type(obj)))
 
     return wrapped_obj
+
+
+def compile_pipeline(method, stages):
+    """
+    Returns a method that runs the original method through the stages
+    """
+    if asyncsupport is not None and asyncsupport.iscoroutinefunction(method):
+        wrapper = asyncsupport.compile_pipeline(method, stages)
+    else:
+        def wrapper(self, request, *args, **kwargs):
+            return run_pipeline(stages, types.MethodType(method, self), request, args, kwargs)
+        update_wrapper(wrapper, method, assigned=available_attrs(method))
+        # Django's own handlers (i.e., View.options) return a coroutine when
+        # the view's handlers are async, so they need both pipelines
+        if asyncsupport is not None and getattr(View, method.__name__, None) is method:
+            wrapper = asyncsupport.compile_view_pipeline(method, stages, wrapper)
+    wrapper._simple_rest_pipeline = (wrapper, method, stages)
+    return wrapper
@@ -1,18 +1,42 @@
+import itertools
 from decimal import Decimal
+
+import six
+from django.conf import settings
 from django.core import serializers
+from django.core.exceptions import ImproperlyConfigured
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models.query import QuerySet
+try:
+    from django.db.models.query import ValuesQuerySet
+except ImportError:
+    # Django >= 1.9
+    ValuesQuerySet = None
 from django.template import Template, Context
+try:
+    from importlib import import_module
+except ImportError:
+    # Python 2.6
+    from django.utils.importlib import import_module
+
+from .. import instrumentation
+from .compat import force_bytes, force_text
 
 import logging
 logger = logging.getLogger(__name__)
 
 try:
     from pygments import highlight
-    from pygments.lexers import JSONLexer
+    try:
+        from pygments.lexers import JsonLexer
+    except ImportError:
+        # Pygments < 1.6
+        from pygments.lexers import JSONLexer as JsonLexer
     from pygments.formatters import HtmlFormatter
+    _json_lexer = JsonLexer()
+    _html_formatter = HtmlFormatter()
     PYGMENTS_INSTALLED = True
-except Exception, e:
+except Exception as e:
     logging.info("Install pygments for syntax highlighting")
     PYGMENTS_INSTALLED = False
 
@@ -22,6 +46,38 @@ except ImportError:
     logging.info('Install simplejson for better performance')
     import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import ujson
+    # Older versions of ujson don't support the default hook
+    ujson.dumps(None, default=str)
+except (ImportError, TypeError):
+    ujson = None
+
+
+# The number of items encoded (and model instances held in memory) at a time
+# when streaming a response
+STREAM_CHUNK_SIZE = 1000
+
+# The default size, in characters, of the largest JSON document that to_html
+# highlights. Can be changed with the SIMPLE_REST_HIGHLIGHT_MAX_SIZE setting
+# (None means there is no limit).
+HIGHLIGHT_MAX_SIZE = 100 * 1024
+
 
 class DecimalEncoder(DjangoJSONEncoder):
     def default(self, obj):
@@ -36,29 +92,355 @@ def to_json(content, indent=None):
 
     This method uses the DJangoJSONEncoder to to ensure that python objects
     such as Decimal objects are properly serialized. It can also serialize
-    Django QuerySet objects.
+    Django QuerySet objects. The JSON is returned as UTF-8 encoded bytes.
+
+    Compact JSON is produced by the backend named in the
+    SIMPLE_REST_JSON_BACKEND setting (see get_json_backend), while indented
+    JSON is always produced by the json module.
+
+    QuerySets are serialized as a list of rows (see queryset_rows) unless the
+    SIMPLE_REST_QUERYSET_ENVELOPE setting is True, in which case Django's JSON
+    serializer is used instead.
     """
     if isinstance(content, QuerySet):
-        json_serializer = serializers.get_serializer('json')()
-        serialized_content = json_serializer.serialize(content, ensure_ascii=False, indent=indent)
+        if _use_envelope(content):
+            # Deferred models would be labelled with the name of Django's
+            # deferred proxy class, so ask the serializer for the fields instead
+            json_serializer = serializers.get_serializer('json')()
+            fields = _selected_fields(content)
+            return force_bytes(json_serializer.serialize(content.defer(None), ensure_ascii=False,
+                                                         indent=indent, fields=fields))
+        content = list(queryset_rows(content))
+        instrumentation.incr('rows_serialized', len(content))
+
+    if indent is None:
+        serialized_content = get_json_backend()(content)
     else:
-        try:
-            serialized_content = json.dumps(content, cls=DecimalEncoder, ensure_ascii=False, indent=indent)
-        except TypeError:
-            # Fix for Django 1.5
-            serialized_content = json.dumps(content, ensure_ascii=False, indent=indent)
+        serialized_content = _json_dumps(content, indent=indent)
     return serialized_content
 
 
+def queryset_rows(queryset):
+    """
+    Returns the rows of the given QuerySet without building model instances
+
+    The rows are read straight from the database with values(), one dict per
+    row, that maps the name of each field to its value (foreign keys map to
+    the primary key of the related object). Only the fields selected with
+    only() are included (along with the primary key) if the QuerySet has been
+    restricted to a subset of its fields. The fields of the related objects
+    picked with select_related() are read in the same query and included as
+    well (e.g., as author__name). QuerySets that have already been turned
+    into values() or values_list() QuerySets are returned as is.
+    """
+    if is_values_queryset(queryset):
+        return queryset
+
+    opts = queryset.model._meta
+    field_names = _selected_fields(queryset) or [field.name for field in opts.fields]
+    if opts.pk.name not in field_names:
+        field_names = [opts.pk.name] + list(field_names)
+    field_names = list(field_names) + _related_field_names(queryset.model, queryset.query.select_related)
+    return queryset.values(*field_names)
+
+
+def _related_field_names(model, select_related, prefix=''):
+    """
+    Returns the lookups of the fields of the related objects named in the
+    select_related() part of a query
+    """
+    # A bare select_related() follows every foreign key, which could pull in
+    # a large part of the database, so it's only honoured for model instances
+    if not isinstance(select_related, dict):
+        return []
+
+    field_names = []
+    for name, nested in select_related.items():
+        related_model = get_related_model(model._meta.get_field(name))
+        lookup = '%s%s__' % (prefix, name)
+        field_names.extend(lookup + field.name for field in related_model._meta.fields)
+        field_names.extend(_related_field_names(related_model, nested, lookup))
+    return field_names
+
+
+def get_related_model(field):
+    """
+    Returns the model a field relates to, or None if it isn't a relation
+    """
+    remote_field = getattr(field, 'remote_field', None)
+    if remote_field is not None:
+        # Django >= 1.9
+        return remote_field.model
+    rel = getattr(field, 'rel', None)
+    return rel and rel.to
+
+
+def is_values_queryset(queryset):
+    """
+    Returns True if the QuerySet returns dicts or tuples (i.e., values() or
+    values_list() was called on it) rather than model instances
+    """
+    if ValuesQuerySet is not None:
+        return isinstance(queryset, ValuesQuerySet)
+    return queryset._fields is not None
+
+
+def _selected_fields(queryset):
+    """
+    Returns the names of the fields the QuerySet was restricted to with only()
+    """
+    field_names, defer = queryset.query.deferred_loading
+    if field_names and not defer:
+        return list(field_names)
+    return None
+
+
+def _use_envelope(queryset):
+    return (getattr(settings, 'SIMPLE_REST_QUERYSET_ENVELOPE', False) and
+            not is_values_queryset(queryset))
+
+
+def _default(obj):
+    """
+    Encodes the objects the JSON backends can't (e.g., Decimal objects and
+    QuerySets nested in the content)
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, QuerySet):
+        return list(queryset_rows(obj))
+    return DjangoJSONEncoder().default(obj)
+
+
+def _json_dumps(content, indent=None):
+    # Pass the default hook rather than DecimalEncoder as the encoder class,
+    # since simplejson can't use encoders derived from the json module's
+    return force_bytes(json.dumps(content, default=_default, ensure_ascii=False, indent=indent))
+
+
+def _orjson_dumps(content):
+    # orjson natively encodes datetime and UUID objects, only Decimal objects
+    # (and lazy translation strings) need to go through the default hook
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _ujson_dumps(content):
+    return force_bytes(ujson.dumps(content, ensure_ascii=False, default=_default))
+
+
+# Maps the name of each available JSON backend to a function that takes a
+# python object and returns it serialized as compact, UTF-8 encoded JSON
+JSON_BACKENDS = {
+    'json': _json_dumps,
+}
+
+# Maps the name of each JSON backend that can also decode JSON to a function
+# that takes JSON (as bytes or text) and returns the python object it encodes
+JSON_DECODERS = {
+    'json': json.loads,
+}
+
+
+def register_json_backend(name, dumps, loads=None):
+    """
+    Makes a JSON backend available to the SIMPLE_REST_JSON_BACKEND setting
+
+    The dumps function must take a single python object and return it as
+    compact JSON encoded as UTF-8 bytes. If given, the loads function must
+    take JSON, as bytes or text, and return the python object it encodes.
+    """
+    JSON_BACKENDS[name] = dumps
+    if loads is not None:
+        JSON_DECODERS[name] = loads
+
+
+if orjson is not None:
+    register_json_backend('orjson', _orjson_dumps, orjson.loads)
+if ujson is not None:
+    register_json_backend('ujson', _ujson_dumps, ujson.loads)
+
+
+_json_backend = None
+
+
+def get_json_backend():
+    """
+    Returns the dumps function of the configured JSON backend
+
+    The SIMPLE_REST_JSON_BACKEND setting can either be the name of a
+    registered backend (e.g., 'json', 'orjson', or 'ujson') or the dotted path
+    to a dumps function. It defaults to 'json', which uses simplejson when it
+    is installed and the standard library's json module otherwise.
+    """
+    global _json_backend
+    if _json_backend is None:
+        name = getattr(settings, 'SIMPLE_REST_JSON_BACKEND', 'json')
+        if name in JSON_BACKENDS:
+            _json_backend = JSON_BACKENDS[name]
+        elif '.' in name:
+            module_name, func_name = name.rsplit('.', 1)
+            try:
+                _json_backend = getattr(import_module(module_name), func_name)
+            except (ImportError, AttributeError) as e:
+                raise ImproperlyConfigured('Error importing JSON backend %s: "%s"' % (name, e))
+        else:
+            raise ImproperlyConfigured('Unknown JSON backend "%s", choices are: %s' % (
+                name, ', '.join(sorted(JSON_BACKENDS))))
+    return _json_backend
+
+
+def from_json(content):
+    """
+    Deserializes JSON into a python object
+
+    The JSON is decoded by the backend named in the SIMPLE_REST_JSON_BACKEND
+    setting, if it can decode JSON, and by the json module otherwise. A
+    ValueError is raised if the content isn't valid JSON.
+    """
+    name = getattr(settings, 'SIMPLE_REST_JSON_BACKEND', 'json')
+    return JSON_DECODERS.get(name, json.loads)(content)
+
+
+def to_json_stream(content, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serializes a python object as a stream of JSON chunks
+
+    QuerySets are walked with iterator() so that only chunk_size rows (or
+    model instances) are held in memory at any one time, and any other
+    iterable (e.g., a generator) is consumed and encoded incrementally, one
+    chunk of items at a time. The chunks, once joined, produce the same JSON
+    array that to_json would have produced for the same content.
+    """
+    encode = to_json
+    if isinstance(content, QuerySet) and _use_envelope(content):
+        # Encode the rows just as Django's JSON serializer would have
+        python_serializer = serializers.get_serializer('python')()
+        fields = _selected_fields(content)
+        chunks = (python_serializer.serialize(chunk, fields=fields)
+                  for chunk in _chunks(content.defer(None).iterator(), chunk_size))
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        encode = lambda row: force_bytes(encoder.encode(row))
+    elif isinstance(content, QuerySet):
+        chunks = _chunks(queryset_rows(content).iterator(), chunk_size)
+    elif isinstance(content, (dict,) + six.string_types) or not hasattr(content, '__iter__'):
+        yield to_json(content)
+        return
+    else:
+        chunks = _chunks(content, chunk_size)
+
+    yield b'['
+    separator = b''
+    for chunk in chunks:
+        instrumentation.incr('rows_serialized', len(chunk))
+        yield separator + b', '.join(encode(item) for item in chunk)
+        separator = b', '
+    yield b']'
+to_json_stream.streaming = True
+
+
+def _chunks(iterable, size):
+    """
+    Splits the given iterable into lists of (at most) size elements
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def to_msgpack(content):
+    """
+    Serializes a python object as MessagePack
+
+    Objects are encoded just as to_json encodes them, e.g., Decimal objects as
+    floats, dates and times as ISO 8601 strings, and QuerySets as lists of rows
+    (see queryset_rows). Requires the msgpack package.
+    """
+    # Byte strings are text on Python 2, just as they are for the JSON backends
+    return msgpack.packb(_binary_content(content), default=_default,
+                         use_bin_type=str is not bytes)
+
+
+def from_msgpack(content):
+    """
+    Deserializes MessagePack into a python object
+    """
+    return msgpack.unpackb(content, raw=False)
+
+
+def to_cbor(content):
+    """
+    Serializes a python object as CBOR
+
+    Objects are encoded just as to_json encodes them, rather than with CBOR's
+    own tags for decimals and dates (see to_msgpack). Requires the cbor2
+    package.
+    """
+    return cbor2.dumps(_plain(_binary_content(content)))
+
+
+def from_cbor(content):
+    """
+    Deserializes CBOR into a python object
+    """
+    return cbor2.loads(content)
+
+
+def _binary_content(content):
+    if isinstance(content, QuerySet):
+        if _use_envelope(content):
+            python_serializer = serializers.get_serializer('python')()
+            content = python_serializer.serialize(content.defer(None), fields=_selected_fields(content))
+        else:
+            content = list(queryset_rows(content))
+        instrumentation.incr('rows_serialized', len(content))
+    return content
+
+
+def _plain(obj):
+    """
+    Returns the object made up only of the types that CBOR encodes just as
+    JSON does
+
+    cbor2 only calls its default hook for the types it doesn't know, so the
+    objects it has tags for (and byte strings, which are text on Python 2)
+    have to be replaced before encoding.
+    """
+    if isinstance(obj, dict):
+        return dict((_plain(key), _plain(value)) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return [_plain(item) for item in obj]
+    elif isinstance(obj, bytes) and str is bytes:
+        return force_text(obj)
+    elif obj is None or isinstance(obj, (six.text_type, bool, float) + six.integer_types):
+        return obj
+    return _plain(_default(obj))
+
+
 def to_html(data):
     """
     Serializes a python object as HTML
 
     This method uses the to_json method to turn the given data object into
     formatted JSON that is displayed in an HTML page. If pygments in installed,
-    syntax highlighting will also be applied to the JSON.
+    syntax highlighting will also be applied to the JSON, unless the JSON is
+    larger than the SIMPLE_REST_HIGHLIGHT_MAX_SIZE setting (in bytes).
     """
-    base_html_template = Template('''
+    code = force_text(to_json(data, indent=4))
+    max_size = getattr(settings, 'SIMPLE_REST_HIGHLIGHT_MAX_SIZE', HIGHLIGHT_MAX_SIZE)
+    if PYGMENTS_INSTALLED and (max_size is None or len(code) <= max_size):
+        c = Context({
+            'body': highlight(code, _json_lexer, _html_formatter),
+            'style': _get_highlight_style()
+        })
+    else:
+        c = Context({'body': code})
+    return _get_html_template().render(c)
+
+
+HTML_TEMPLATE = '''
         <html>
             <head>
                 {% if style %}
@@ -71,23 +453,30 @@ def to_html(data):
                 {% if style %}
                     {{ body|safe }}
                 {% else %}
-                    <pre></code>{{ body }}</code></pre>
+                    <pre><code>{{ body }}</code></pre>
                 {% endif %}
             </body>
         </html>
-        ''')
+        '''
 
-    code = to_json(data, indent=4)
-    if PYGMENTS_INSTALLED:
-        c = Context({
-            'body': highlight(code, JSONLexer(), HtmlFormatter()),
-            'style': HtmlFormatter().get_style_defs('.highlight')
-        })
-        html = base_html_template.render(c)
-    else:
-        c = Context({'body': code})
-        html = base_html_template.render(c)
-    return html
+# The template, and the stylesheet used for syntax highlighting, are only
+# built once, on first use, since Django's settings must be configured first
+_html_template = None
+_highlight_style = None
+
+
+def _get_html_template():
+    global _html_template
+    if _html_template is None:
+        _html_template = Template(HTML_TEMPLATE)
+    return _html_template
+
+
+def _get_highlight_style():
+    global _highlight_style
+    if _highlight_style is None:
+        _highlight_style = _html_formatter.get_style_defs('.highlight')
+    return _highlight_style
 
 def to_text(data):
     """
@@ -98,7 +487,7 @@ def to_text(data):
     """
     try:
         serialized_content = to_json(data, indent=4)
-    except Exception, e:
+    except Exception as e:
         serialized_content = data
     return serialized_content
 